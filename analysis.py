@@ -0,0 +1,126 @@
+"""Carrega o dataset de métricas uma única vez e calcula todas as estatísticas das questões de pesquisa"""
+from dataclasses import dataclass
+
+import pandas as pd
+
+from profiling import profiled
+from storage import read_metrics
+
+LINGUAGENS_MAINSTREAM = ['JavaScript', 'Python', 'TypeScript', 'Java', 'C++', 'C#']
+
+
+def load_metrics(path=None, columns=None):
+    """Lê o dataset (Parquet quando disponível) com o esquema tipado; 'N/A' em linguagem_primaria vira ausente"""
+    return read_metrics(path, columns)
+
+
+@dataclass
+class ResearchStats:
+    """Resultados de RQ01–RQ07, usados tanto na saída do console quanto no relatório em markdown"""
+    df: pd.DataFrame
+    total: int
+
+    # Visão geral
+    idade_media: float
+    prs_media: float
+    releases_media: float
+    atualizacao_media: float
+    linguagem_mais_comum: str
+    issues_fechadas_soma: int
+    total_issues_soma: int
+    taxa_resolucao_media: float
+
+    # RQ01
+    idade_mediana: float
+    repos_maduros: int
+
+    # RQ02
+    prs_mediana: float
+    prs_max: int
+    repo_mais_prs: str
+
+    # RQ03
+    releases_mediana: float
+    repos_com_releases: int
+
+    # RQ04
+    atualizacao_mediana: float
+    repos_ativos: int
+
+    # RQ05
+    linguagens_count: pd.Series
+    repos_mainstream: int
+
+    # RQ06 (apenas repositórios com issues)
+    repos_com_issues: int
+    taxa_mediana: float
+    taxa_media: float
+    repos_alta_resolucao: int
+
+    # RQ07: uma linha por linguagem, na ordem em que aparecem no dataset
+    por_linguagem: pd.DataFrame
+
+
+def compute_research_stats(df):
+    """Calcula todas as estatísticas: um agg sobre o dataset inteiro e um groupby(...).agg(...) por linguagem"""
+    # O armazenamento usa float32; as colunas (gravadas com 2 casas) voltam a float64 exatos antes de agregar,
+    # senão o ruído do float32 muda medianas que caem na casa .xx5
+    df = df.assign(**{column: df[column].astype('float64').round(2) for column in df.select_dtypes('float32').columns})
+    geral = df.agg({
+        'idade_repositorio_dias': ['median', 'mean'],
+        'pull_requests_aceitas': ['median', 'mean', 'max', 'idxmax'],
+        'releases': ['median', 'mean'],
+        'tempo_ate_ultima_atualizacao_dias': ['median', 'mean'],
+        'issues_fechadas': ['sum'],
+        'total_issues': ['sum'],
+        'taxa_resolucao_issues_pct': ['mean'],
+    })
+
+    por_linguagem = df.groupby('linguagem_primaria', sort=False, observed=True).agg(
+        repositorios=('nameWithOwner', 'size'),
+        prs_mediana=('pull_requests_aceitas', 'median'),
+        prs_media=('pull_requests_aceitas', 'mean'),
+        releases_mediana=('releases', 'median'),
+        releases_media=('releases', 'mean'),
+        atualizacao_mediana=('tempo_ate_ultima_atualizacao_dias', 'median'),
+        atualizacao_media=('tempo_ate_ultima_atualizacao_dias', 'mean'),
+    )
+    linguagens_count = por_linguagem['repositorios'].sort_values(ascending=False, kind='stable')
+    maiores = linguagens_count[linguagens_count == linguagens_count.max()] if len(linguagens_count) else linguagens_count
+    mainstream = por_linguagem.index.isin(LINGUAGENS_MAINSTREAM)
+
+    taxa = df['taxa_resolucao_issues_pct'][df['total_issues'] > 0]
+
+    return ResearchStats(
+        df=df,
+        total=len(df),
+        idade_media=geral.at['mean', 'idade_repositorio_dias'],
+        prs_media=geral.at['mean', 'pull_requests_aceitas'],
+        releases_media=geral.at['mean', 'releases'],
+        atualizacao_media=geral.at['mean', 'tempo_ate_ultima_atualizacao_dias'],
+        linguagem_mais_comum=min(str(linguagem) for linguagem in maiores.index) if len(maiores) else 'N/A',
+        issues_fechadas_soma=int(geral.at['sum', 'issues_fechadas']),
+        total_issues_soma=int(geral.at['sum', 'total_issues']),
+        taxa_resolucao_media=geral.at['mean', 'taxa_resolucao_issues_pct'],
+        idade_mediana=geral.at['median', 'idade_repositorio_dias'],
+        repos_maduros=int((df['maturidade'] == 'Maduro').sum()),
+        prs_mediana=geral.at['median', 'pull_requests_aceitas'],
+        prs_max=int(geral.at['max', 'pull_requests_aceitas']),
+        repo_mais_prs=df.at[int(geral.at['idxmax', 'pull_requests_aceitas']), 'nameWithOwner'],
+        releases_mediana=geral.at['median', 'releases'],
+        repos_com_releases=int((df['releases'] > 0).sum()),
+        atualizacao_mediana=geral.at['median', 'tempo_ate_ultima_atualizacao_dias'],
+        repos_ativos=int((df['atividade_recente'] == 'Ativo').sum()),
+        linguagens_count=linguagens_count,
+        repos_mainstream=int(por_linguagem.loc[mainstream, 'repositorios'].sum()),
+        repos_com_issues=len(taxa),
+        taxa_mediana=taxa.median(),
+        taxa_media=taxa.mean(),
+        repos_alta_resolucao=int((taxa > 80).sum()),
+        por_linguagem=por_linguagem,
+    )
+
+
+@profiled()
+def load_research_stats(path=None):
+    return compute_research_stats(load_metrics(path))
@@ -0,0 +1,199 @@
+"""Coleta assíncrona dos detalhes dos repositórios, com paralelismo limitado e ritmo guiado pelo rateLimit"""
+import asyncio
+import time
+from datetime import datetime
+
+import aiohttp
+
+from cache import repo_key
+from github_client import RETRY_STATUS, backoff_delay, query_cost, rate_limited
+from profiling import PROFILE, profiled
+from token_pool import TokenPool
+from queries import FULL_SELECTION, MAX_NODES_PER_BATCH, build_batched_details_query, estimated_cost
+
+
+class RateLimiter:
+    """Controla o ritmo das requisições a partir do rateLimit da API e dos cabeçalhos Retry-After"""
+
+    def __init__(self, min_remaining=50):
+        self.min_remaining = min_remaining
+        self.remaining = None
+        self.reset_at = None
+        self.last_cost = 1
+        self.blocked_until = 0.0
+
+    def update(self, rate_limit):
+        """Atualiza o estado com o campo rateLimit { cost remaining resetAt } da resposta"""
+        if not rate_limit:
+            return
+        self.remaining = rate_limit['remaining']
+        self.last_cost = max(rate_limit.get('cost') or 1, 1)
+        self.reset_at = datetime.fromisoformat(rate_limit['resetAt'].replace('Z', '+00:00')).timestamp()
+
+    def block_for(self, seconds):
+        """Suspende todas as requisições pelo tempo indicado (ex.: Retry-After do limite secundário)"""
+        self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+    def delay(self):
+        """Quanto tempo esperar antes da próxima requisição"""
+        now = time.time()
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.remaining is None or self.reset_at is None or self.reset_at <= now:
+            return 0.0
+        if self.remaining <= self.last_cost:
+            return self.reset_at - now
+        if self.remaining < self.min_remaining:
+            # Distribui os pontos restantes até o reset em vez de esgotá-los de uma vez
+            return (self.reset_at - now) / (self.remaining / self.last_cost)
+        return 0.0
+
+    async def wait(self):
+        delay = self.delay()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.delay()
+
+
+class AsyncDetailsCollector:
+    """Busca os detalhes em lotes aliased, com no máximo `concurrency` requisições simultâneas.
+
+    Com um TokenPool, cada requisição usa o token com mais pontos; o pool estaciona os tokens esgotados.
+    """
+
+    def __init__(self, token, api_url, concurrency=8, batch_size=50, max_nodes=MAX_NODES_PER_BATCH,
+                 max_retries=5, timeout=30, cache=None, selection=FULL_SELECTION):
+        self.token_pool = token if isinstance(token, TokenPool) else TokenPool([token])
+        self.cache = cache
+        self.selection = selection
+        self.api_url = api_url
+        self.concurrency = concurrency
+        self.batch_size = max(1, min(batch_size, max_nodes // selection.node_cost))
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.limiter = RateLimiter()
+        self.requests = 0
+        self.retries = 0
+        self.cost = 0
+        self.bytes = 0
+
+    async def _post(self, session, semaphore, query, variables, cost=1):
+        """Envia uma query, repetindo em limites secundários, erros temporários, falhas de rede e timeouts"""
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.wait()
+            async with semaphore:
+                self.requests += 1
+                token = await self.token_pool.acquire_async(cost)
+                response_headers = None
+                try:
+                    async with session.post(self.api_url, json={'query': query, 'variables': variables},
+                                            headers={'Authorization': f'bearer {token}'}) as response:
+                        response_headers = response.headers
+                        status = response.status
+                        self.bytes += response.content_length or 0
+                        if status == 200:
+                            result = await response.json()
+                        else:
+                            text = await response.text()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status, text = None, f"{type(e).__name__}: {e}"
+                finally:
+                    # A reserva do token volta ao pool em qualquer desfecho, inclusive timeout
+                    self.token_pool.release(token, response_headers, cost)
+
+            if status == 200:
+                self.cost += query_cost(result, cost)
+                if len(self.token_pool) == 1:
+                    self.limiter.update((result.get('data') or {}).get('rateLimit'))
+                return result
+
+            delay = 0
+            if status is None:
+                # Falha de rede ou timeout: só esta requisição espera o backoff, as demais seguem
+                delay = backoff_delay(attempt)
+            elif not rate_limited(status, response_headers, cost):
+                # Token sem pontos não para a coleta: o pool o estaciona até o reset e a próxima tentativa usa outro
+                retry_after = response_headers.get('Retry-After')
+                if retry_after:
+                    self.limiter.block_for(float(retry_after))
+                elif status in RETRY_STATUS and (status != 403 or 'X-RateLimit-Remaining' in response_headers):
+                    self.limiter.block_for(backoff_delay(attempt))
+                else:
+                    raise Exception(f"Query falhou com o código {status}:\n{text}")
+
+            if attempt == self.max_retries:
+                if status is None:
+                    raise Exception(f"Query falhou após {attempt + 1} tentativas: {text}")
+                raise Exception(f"Query falhou com o código {status}:\n{text}")
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _fetch_batch(self, session, semaphore, batch):
+        """Busca um lote; se falhar, divide o lote ao meio e tenta cada metade"""
+        query, variables = build_batched_details_query(batch, self.selection.fragment)
+        try:
+            result = await self._post(session, semaphore, query, variables,
+                                      estimated_cost(len(batch), self.selection.node_cost))
+            if not result.get('data'):
+                raise Exception(f"Erro na API do GitHub: {result.get('errors')}")
+        except Exception as e:
+            if len(batch) == 1:
+                repo_node = batch[0]
+                print(f"\nERRO ao buscar detalhes para {repo_node['owner']['login']}/{repo_node['name']}: {e}")
+                return []
+            middle = len(batch) // 2
+            halves = await asyncio.gather(self._fetch_batch(session, semaphore, batch[:middle]),
+                                          self._fetch_batch(session, semaphore, batch[middle:]))
+            return halves[0] + halves[1]
+
+        batch_data = []
+        cache_items = []
+        for i, repo_node in enumerate(batch):
+            repo_details = result['data'].get(f"r{i}")
+            if repo_details:
+                batch_data.append(repo_details)
+                cache_items.append((repo_key(repo_node), repo_details))
+            else:
+                print(f"\nAVISO: Não foi possível obter detalhes para {repo_node['owner']['login']}/{repo_node['name']}.")
+        if self.cache:
+            self.cache.set_many(cache_items, self.selection.fragment)
+        return batch_data
+
+    async def collect(self, data):
+        """Busca os detalhes de todos os repositórios, preservando a ordem de entrada"""
+        headers = {'Content-Type': 'application/json'}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        batches = [data[start:start + self.batch_size] for start in range(0, len(data), self.batch_size)]
+        done = 0
+
+        async def run(batch):
+            nonlocal done
+            batch_data = await self._fetch_batch(session, semaphore, batch)
+            done += len(batch)
+            print(f"\rCarregando detalhes {done / len(data) * 100:.1f}%", end='', flush=True)
+            return batch_data
+
+        async with aiohttp.ClientSession(headers=headers, timeout=self.timeout) as session:
+            results = await asyncio.gather(*(run(batch) for batch in batches))
+        print()
+        return [repo for batch_data in results for repo in batch_data]
+
+
+@profiled()
+def get_repo_details_async(data, token, api_url, concurrency=8, batch_size=50, max_nodes=MAX_NODES_PER_BATCH,
+                           cache=None, selection=FULL_SELECTION):
+    """Versão síncrona de AsyncDetailsCollector.collect para uso no main"""
+    if not token:
+        raise Exception("Token do GitHub não encontrado. Configure a variável de ambiente GITHUB_TOKEN.")
+
+    collector = AsyncDetailsCollector(token, api_url, concurrency, batch_size, max_nodes, cache=cache,
+                                      selection=selection)
+    print(f"Buscando detalhes para {len(data)} repositórios "
+          f"(lotes de {collector.batch_size}, até {concurrency} requisições simultâneas)...")
+    started = time.time()
+    repo_data = asyncio.run(collector.collect(data))
+    print(f"{collector.requests} requisições ({collector.retries} repetidas) em {time.time() - started:.2f}s")
+    PROFILE.add_request_stats({'GetRepoDetailsBatch (async)': {
+        'requests': collector.requests, 'retries': collector.retries, 'cost': collector.cost, 'bytes': collector.bytes,
+    }})
+    return repo_data
@@ -0,0 +1,194 @@
+"""Benchmarks offline da coleta e da análise, com dados sintéticos e o servidor GraphQL falso"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from fake_github import LANGUAGES, REFERENCE_DATE, FakeGitHubServer
+from metrics import build_metrics_frame, iter_repo_metrics, metrics_frame
+from profiling import PROFILE
+
+SECONDS_PER_DAY = 60 * 60 * 24
+
+
+def synthetic_repo_records(n, seed=42):
+    """Gera `n` respostas no formato de RepoDetails, com valores aleatórios mas reprodutíveis"""
+    rng = np.random.default_rng(seed)
+    reference = REFERENCE_DATE.timestamp()
+    created = reference - rng.integers(30, 5000, n) * SECONDS_PER_DAY
+    pushed = reference - rng.integers(0, 400, n) * SECONDS_PER_DAY
+    created_iso = np.datetime_as_string(created.astype('datetime64[s]'), unit='s')
+    pushed_iso = np.datetime_as_string(pushed.astype('datetime64[s]'), unit='s')
+    languages = rng.choice(len(LANGUAGES), n)
+    releases = rng.integers(0, 500, n)
+    pull_requests = rng.integers(0, 30000, n)
+    total_issues = rng.integers(0, 20000, n)
+    closed_issues = (total_issues * rng.random(n)).astype(int)
+
+    return [
+        {
+            'nameWithOwner': f"owner{i}/repo{i}",
+            'createdAt': f"{created_iso[i]}Z",
+            'pushedAt': f"{pushed_iso[i]}Z",
+            'primaryLanguage': {'name': LANGUAGES[languages[i]]} if LANGUAGES[languages[i]] else None,
+            'releases': {'totalCount': int(releases[i])},
+            'pullRequests': {'totalCount': int(pull_requests[i])},
+            'totalIssues': {'totalCount': int(total_issues[i])},
+            'closedIssues': {'totalCount': int(closed_issues[i])},
+        }
+        for i in range(n)
+    ]
+
+
+def iter_synthetic_chunks(n, chunk_size=100_000, seed=42):
+    """Gera o dataset sintético em blocos, para que 1M de registros não precise existir inteiro em memória"""
+    for start in range(0, n, chunk_size):
+        records = synthetic_repo_records(min(chunk_size, n - start), seed + start)
+        for i, record in enumerate(records, start):
+            record['nameWithOwner'] = f"owner{i}/repo{i}"
+        yield records
+
+
+def timed(func, *args, repeat=3):
+    """Executa `func` algumas vezes e retorna (melhor tempo, último resultado)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def bench_metrics(rows):
+    """Compara a derivação de métricas linha a linha com a versão vetorizada"""
+    records = synthetic_repo_records(rows)
+    now = time.time()
+    row_time, row_df = timed(lambda: metrics_frame(list(iter_repo_metrics(records, now))))
+    vector_time, vector_df = timed(lambda: build_metrics_frame(records, now))
+
+    mismatches = (row_df['maturidade'] != vector_df['maturidade'].astype(object)).sum()
+    print(f"Derivação de métricas ({rows} registros)")
+    print(f" Linha a linha: {row_time:.3f}s ({rows / row_time:,.0f} linhas/s)")
+    print(f" Vetorizada:    {vector_time:.3f}s ({rows / vector_time:,.0f} linhas/s)")
+    print(f" Speedup: {row_time / vector_time:.1f}x, divergências de rótulo: {mismatches}")
+
+
+def bench_collection(total=1000, latency=0.05, points_per_hour=5000, reset_interval=3600, secondary_limit_every=0,
+                     tokens=1, batch_size=50, use_async=False, concurrency=8):
+    """Coleta `total` repositórios do servidor falso com latência e limites injetados e mede cada etapa"""
+    with FakeGitHubServer(total_repos=total, latency=latency, points_per_hour=points_per_hour,
+                          reset_interval=reset_interval, secondary_limit_every=secondary_limit_every) as server:
+        # O main lê a URL e os tokens do ambiente ao ser importado
+        os.environ['GITHUB_API_URL'] = server.url
+        os.environ['TOKENS'] = ",".join(f"bench-token-{i}" for i in range(tokens))
+        import main
+
+        PROFILE.reset()
+        with PROFILE.stage('coleta (total)') as info, contextlib.redirect_stdout(io.StringIO()):
+            repo_nodes = main.get_all_top_repos(total)
+            if use_async:
+                from async_collector import get_repo_details_async
+                repo_data = get_repo_details_async(repo_nodes, main.get_token_pool(), server.url, concurrency,
+                                                   batch_size)
+            else:
+                repo_data = main.get_repo_details_batched(repo_nodes, batch_size)
+            info['rows'] = len(repo_data)
+        PROFILE.add_request_stats(main.get_client().stats)
+        server_stats = server.stats()
+
+    print(f"Coleta de {total} repositórios (latência {latency * 1000:.0f}ms, {points_per_hour} pontos/token, "
+          f"{tokens} token(s), {'assíncrona' if use_async else 'em lotes'})")
+    PROFILE.print_summary()
+    print(f"Servidor: {server_stats['requests']} requisições, {server_stats['rate_limited']} limitadas, "
+          f"até {server_stats['max_in_flight']} simultâneas")
+
+
+def bench_pipeline(rows, chunk_size=100_000):
+    """Mede derivação de métricas, gravação, análise e relatório sobre um dataset sintético de `rows` linhas"""
+    from analysis import load_research_stats
+    from generate_report import generate_research_report
+    from storage import write_metrics
+
+    PROFILE.reset()
+    with tempfile.TemporaryDirectory() as directory, PROFILE.stage('pipeline (total)') as total:
+        now = time.time()
+        frames = []
+        chunks = iter_synthetic_chunks(rows, chunk_size)
+        while True:
+            with PROFILE.stage('geração sintética'):
+                records = next(chunks, None)
+            if records is None:
+                break
+            with PROFILE.stage('métricas') as info:
+                frames.append(build_metrics_frame(records, now))
+                info['rows'] = len(records)
+        with PROFILE.stage('métricas') as info:
+            df = pd.concat(frames, ignore_index=True)
+        del frames
+
+        parquet_path = os.path.join(directory, 'repo_metrics.parquet')
+        with PROFILE.stage('gravação parquet') as info:
+            write_metrics(df, parquet_path)
+            info['rows'] = len(df)
+        with PROFILE.stage('gravação csv') as info:
+            write_metrics(df, os.path.join(directory, 'repo_metrics.csv'))
+            info['rows'] = len(df)
+
+        with PROFILE.stage('análise') as info:
+            stats = load_research_stats(parquet_path)
+            info['rows'] = stats.total
+
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with PROFILE.stage('relatório') as info, contextlib.redirect_stdout(io.StringIO()):
+                generate_research_report(df, stats=stats)
+                info['rows'] = stats.total
+        finally:
+            os.chdir(cwd)
+        total['rows'] = len(df)
+
+    print(f"Pipeline sobre {rows:,} linhas sintéticas")
+    PROFILE.print_summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline do pipeline de repositórios")
+    parser.add_argument("benchmark", choices=["metrics", "collection", "pipeline", "all"])
+    parser.add_argument("--rows", type=int, default=100_000, help="Linhas do benchmark de métricas")
+    parser.add_argument("--sizes", default="1000,100000,1000000",
+                        help="Tamanhos dos datasets sintéticos do benchmark de pipeline, separados por vírgula")
+    parser.add_argument("--total", type=int, default=1000, help="Repositórios servidos e coletados na coleta")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência injetada por requisição, em segundos")
+    parser.add_argument("--points", type=int, default=5000, help="Pontos por token antes do reset")
+    parser.add_argument("--reset-interval", type=float, default=3600, help="Segundos até o reset dos pontos")
+    parser.add_argument("--secondary-every", type=int, default=0,
+                        help="Responde com limite secundário (403 + Retry-After) a cada N requisições")
+    parser.add_argument("--tokens", type=int, default=1, help="Quantidade de tokens falsos no pool")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--async", dest="use_async", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--profile-output", help="Grava o perfil (JSON) do último benchmark neste arquivo")
+    args = parser.parse_args()
+
+    if args.benchmark in ("metrics", "all"):
+        bench_metrics(args.rows)
+    if args.benchmark in ("collection", "all"):
+        bench_collection(args.total, args.latency, args.points, args.reset_interval, args.secondary_every,
+                         args.tokens, args.batch_size, args.use_async, args.concurrency)
+    if args.benchmark in ("pipeline", "all"):
+        for size in (int(size) for size in args.sizes.split(",")):
+            print()
+            bench_pipeline(size)
+    if args.profile_output:
+        PROFILE.write(args.profile_output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Cache persistente (SQLite) das respostas da API, usado para retomar coletas interrompidas"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "github_cache.sqlite"
+DEFAULT_TTL_HOURS = 24
+
+
+def repo_key(repo_node):
+    """Chave de cache de um repositório no formato owner/name"""
+    return f"{repo_node['owner']['login']}/{repo_node['name']}".lower()
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()[:16]
+
+
+class ResponseCache:
+    """Respostas indexadas por (chave, hash da query), com expiração por TTL.
+
+    A chave é o nameWithOwner para os detalhes e o cursor para as páginas da busca;
+    o hash da query garante que uma mudança nos campos pedidos invalida as entradas antigas.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_hours=DEFAULT_TTL_HOURS):
+        self.path = path
+        self.ttl = ttl_hours * 60 * 60
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT NOT NULL,
+                query_hash TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (key, query_hash)
+            )
+        """)
+        self.connection.commit()
+        self.evict_expired()
+
+    def get(self, key, query):
+        """Retorna a resposta guardada, ou None se não existir ou tiver expirado"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM responses WHERE key = ? AND query_hash = ? AND created_at >= ?",
+                (key, query_hash(query), time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, query, value):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, query_hash, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, query_hash(query), json.dumps(value), time.time()),
+            )
+            self.connection.commit()
+
+    def set_many(self, items, query):
+        """Grava várias respostas (chave, valor) em uma única transação"""
+        now = time.time()
+        digest = query_hash(query)
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO responses (key, query_hash, value, created_at) VALUES (?, ?, ?, ?)",
+                [(key, digest, json.dumps(value), now) for key, value in items],
+            )
+            self.connection.commit()
+
+    def evict_expired(self):
+        """Remove as entradas mais antigas que o TTL"""
+        with self.lock:
+            deleted = self.connection.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self.connection.commit()
+            return deleted
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,319 @@
+"""Servidor GraphQL falso, no formato da API do GitHub, para testar a coleta sem rede e sem token"""
+import bisect
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LANGUAGES = ['JavaScript', 'Python', 'TypeScript', 'Java', 'C++', 'Go', 'Rust', 'C', 'Markdown', None]
+REFERENCE_DATE = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+ALIAS_PATTERN = re.compile(r'(\w+):\s*repository\(owner:\s*\$(\w+),\s*name:\s*\$(\w+)\)')
+SEARCH_FIELDS = ('owner', 'name', 'nameWithOwner', 'pushedAt', 'stargazerCount')
+FIRST_PATTERN = re.compile(r'search\([^)]*first:\s*(\d+)')
+STARS_PATTERN = re.compile(r'stars:(?:>=(\d+)|(\d+)\.\.(\d+))')
+CREATED_PATTERN = re.compile(r'created:(\d{4})-')
+HISTORY_PATTERN = re.compile(r'history:\s*(releases|pullRequests|issues)\(')
+FRAGMENT_PATTERN = re.compile(r'fragment RepoDetails on Repository \{(.*)\}', re.S)
+DETAIL_FIELDS = ('createdAt', 'pushedAt', 'primaryLanguage', 'releases', 'pullRequests', 'totalIssues', 'closedIssues')
+DETAIL_CONNECTIONS = ('primaryLanguage', 'releases', 'pullRequests', 'totalIssues', 'closedIssues')
+HISTORY_PAGE_SIZE = 100
+SEARCH_CAP = 1000
+
+
+def isoformat(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def fake_repository(owner, name):
+    """Gera detalhes determinísticos de um repositório a partir do seu nome"""
+    rng = random.Random(f"{owner}/{name}")
+    created_at = REFERENCE_DATE - timedelta(days=rng.randint(30, 5000))
+    pushed_at = REFERENCE_DATE - timedelta(days=rng.randint(0, 400))
+    language = rng.choice(LANGUAGES)
+    total_issues = rng.randint(0, 20000)
+    return {
+        'owner': {'login': owner},
+        'name': name,
+        'nameWithOwner': f"{owner}/{name}",
+        'createdAt': isoformat(created_at),
+        'pushedAt': isoformat(pushed_at),
+        'primaryLanguage': {'name': language} if language else None,
+        'releases': {'totalCount': rng.randint(0, 500)},
+        'pullRequests': {'totalCount': rng.randint(0, 30000)},
+        'totalIssues': {'totalCount': total_issues},
+        'closedIssues': {'totalCount': rng.randint(0, total_issues)},
+    }
+
+
+def requested_details(query):
+    """Campos do fragmento RepoDetails pedidos na query (nenhum, se a query não usa o fragmento)"""
+    match = FRAGMENT_PATTERN.search(query)
+    if not match:
+        return ()
+    return tuple(field for field in DETAIL_FIELDS if re.search(rf'\b{field}\b', match.group(1)))
+
+
+def select_details(repo, fields):
+    """Só os campos pedidos, como a API real responde; identificação e estrelas ficam sempre"""
+    keep = {'owner', 'name', 'nameWithOwner', 'stargazerCount', *fields}
+    return {key: value for key, value in repo.items() if key in keep}
+
+
+def query_cost(query, variables):
+    """Custo em pontos como o da API: nós pedidos (o repositório e cada conexão do fragmento) a cada 100, no mínimo 1"""
+    fields = requested_details(query)
+    if not fields:
+        return 1
+    match = FIRST_PATTERN.search(query)
+    repos = len(ALIAS_PATTERN.findall(query)) or variables.get('pageSize') or (int(match.group(1)) if match else 1)
+    nodes = repos * (1 + sum(field in DETAIL_CONNECTIONS for field in fields))
+    return max(1, math.ceil(nodes / 100))
+
+
+def fake_history(owner, name, connection, offset, first):
+    """Uma página determinística de releases, PRs mescladas ou issues fechadas, da mais recente para a mais antiga"""
+    repository = fake_repository(owner, name)
+    total = {'releases': repository['releases'], 'pullRequests': repository['pullRequests'],
+             'issues': repository['closedIssues']}[connection]['totalCount']
+    # Intervalo médio entre eventos, fixo por repositório e tipo de conexão
+    interval = random.Random(f"{owner}/{name}/{connection}").uniform(0.05, 30)
+    end = min(offset + first, total)
+    nodes = []
+    for position in range(offset, end):
+        rng = random.Random(f"{owner}/{name}/{connection}/{position}")
+        moment = REFERENCE_DATE - timedelta(days=position * interval + rng.uniform(0, interval))
+        if connection == 'releases':
+            nodes.append({'createdAt': isoformat(moment)})
+        elif connection == 'pullRequests':
+            nodes.append({'mergedAt': isoformat(moment)})
+        else:
+            nodes.append({'createdAt': isoformat(moment - timedelta(days=rng.expovariate(1 / 20))),
+                          'closedAt': isoformat(moment)})
+    return {'nodes': nodes, 'pageInfo': {'endCursor': str(end), 'hasNextPage': end < total}}
+
+
+class FakeGitHubServer:
+    """Servidor local que responde às queries de busca, de detalhes e de histórico da coleta.
+
+    Permite injetar latência, limite de pontos por token e respostas de limite
+    secundário (403 com Retry-After) para testar throughput e back-off offline.
+    """
+
+    def __init__(self, total_repos=1000, latency=0.0, points_per_hour=5000, reset_interval=3600,
+                 secondary_limit_every=0, retry_after=1, failing_repos=(), port=0, top_stars=400000):
+        self.total_repos = total_repos
+        # Estrelas decrescentes com o índice, com empates nas faixas mais baixas
+        self.stars = [max(1, int(top_stars * 0.998 ** index)) for index in range(total_repos)]
+        self.negated_stars = [-stars for stars in self.stars]
+        self.latency = latency
+        self.points_per_hour = points_per_hour
+        self.reset_interval = reset_interval
+        self.secondary_limit_every = secondary_limit_every
+        self.retry_after = retry_after
+        self.failing_repos = set(failing_repos)
+        self.port = port
+
+        self.lock = threading.Lock()
+        self.budgets = {}
+        self.requests = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+    def start(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'rate_limited': self.rate_limited,
+                'max_in_flight': self.max_in_flight,
+            }
+
+    def repo_node(self, index):
+        node = fake_repository(f"owner{index}", f"repo{index}")
+        node['stargazerCount'] = self.stars[index]
+        return node
+
+    def search_matches(self, search_query):
+        """Índices dos repositórios que atendem aos filtros stars: e created: da busca, em ordem de estrelas"""
+        low, high = 0, float('inf')
+        match = STARS_PATTERN.search(search_query)
+        if match:
+            low = int(match.group(1) or match.group(2))
+            high = int(match.group(3)) if match.group(3) else float('inf')
+        start = bisect.bisect_left(self.negated_stars, -high)
+        end = bisect.bisect_right(self.negated_stars, -low)
+        matches = range(start, end)
+
+        created = CREATED_PATTERN.search(search_query)
+        if created:
+            matches = [index for index in matches
+                       if fake_repository(f"owner{index}", f"repo{index}")['createdAt'].startswith(created.group(1))]
+        return matches
+
+    def _consume_budget(self, token, cost=1):
+        """Desconta `cost` pontos do token; retorna (permitido, restantes, reset em epoch)"""
+        now = time.time()
+        with self.lock:
+            remaining, reset_at = self.budgets.get(token, (self.points_per_hour, now + self.reset_interval))
+            if now >= reset_at:
+                remaining, reset_at = self.points_per_hour, now + self.reset_interval
+            allowed = remaining >= cost
+            if allowed:
+                remaining -= cost
+            self.budgets[token] = (remaining, reset_at)
+            return allowed, remaining, reset_at
+
+    def _resolve(self, query, variables, remaining, reset_at, cost=1):
+        data = {}
+        errors = []
+        details = requested_details(query)
+
+        if 'search(' in query:
+            matches = self.search_matches(variables.get('searchQuery') or 'is:public sort:stars-desc')
+            available = min(len(matches), SEARCH_CAP)
+            offset = int(variables.get('afterCursor') or 0)
+            match = FIRST_PATTERN.search(query)
+            first = variables.get('pageSize') or (int(match.group(1)) if match else 100)
+            end = min(offset + first, available)
+            nodes = []
+            for position in range(offset, end):
+                node = self.repo_node(matches[position])
+                nodes.append(select_details(node, details) if details else {key: node[key] for key in SEARCH_FIELDS})
+            data['search'] = {
+                'repositoryCount': len(matches),
+                'nodes': nodes,
+                'pageInfo': {'endCursor': str(end), 'hasNextPage': end < available},
+            }
+
+        aliases = ALIAS_PATTERN.findall(query)
+        if not aliases and 'repository(owner: $owner, name: $name)' in query:
+            aliases = [('repository', 'owner', 'name')]
+        for alias, owner_var, name_var in aliases:
+            owner, name = variables[owner_var], variables[name_var]
+            if f"{owner}/{name}" in self.failing_repos:
+                data[alias] = None
+                errors.append({'type': 'NOT_FOUND', 'path': [alias],
+                               'message': f"Could not resolve to a Repository with the name '{owner}/{name}'."})
+            else:
+                data[alias] = select_details(fake_repository(owner, name), details)
+                history = HISTORY_PATTERN.search(query)
+                if history:
+                    offset = int(variables.get('afterCursor') or 0)
+                    data[alias] = {'history': fake_history(owner, name, history.group(1), offset, HISTORY_PAGE_SIZE)}
+
+        if 'rateLimit' in query:
+            data['rateLimit'] = {
+                'cost': cost,
+                'remaining': remaining,
+                'resetAt': isoformat(datetime.fromtimestamp(reset_at, timezone.utc)),
+            }
+
+        response = {'data': data}
+        if errors:
+            response['errors'] = errors
+        return response
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    for key, value in (headers or {}).items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass # O cliente desistiu da requisição (timeout) antes da resposta
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request_body = json.loads(self.rfile.read(length) or b'{}')
+                token = self.headers.get('Authorization', '')
+
+                with fake.lock:
+                    fake.requests += 1
+                    request_number = fake.requests
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    if fake.latency:
+                        time.sleep(fake.latency)
+
+                    if fake.secondary_limit_every and request_number % fake.secondary_limit_every == 0:
+                        with fake.lock:
+                            fake.rate_limited += 1
+                        self._send(403, {'message': 'You have exceeded a secondary rate limit.'},
+                                   {'Retry-After': str(fake.retry_after)})
+                        return
+
+                    query = request_body.get('query', '')
+                    variables = request_body.get('variables') or {}
+                    cost = query_cost(query, variables)
+                    allowed, remaining, reset_at = fake._consume_budget(token, cost)
+                    rate_headers = {
+                        'X-RateLimit-Limit': str(fake.points_per_hour),
+                        'X-RateLimit-Remaining': str(remaining),
+                        'X-RateLimit-Reset': str(int(reset_at)),
+                    }
+                    if not allowed:
+                        with fake.lock:
+                            fake.rate_limited += 1
+                        self._send(403, {'message': 'API rate limit exceeded.'}, rate_headers)
+                        return
+
+                    response = fake._resolve(query, variables, remaining, reset_at, cost)
+                    self._send(200, response, rate_headers)
+                finally:
+                    with fake.lock:
+                        fake.in_flight -= 1
+
+        return Handler
+
+
+if __name__ == '__main__':
+    # Sobe o servidor para uso manual: GITHUB_API_URL=http://127.0.0.1:8765/graphql TOKEN=x python main.py
+    server = FakeGitHubServer(port=8765).start()
+    print(f"Servidor GraphQL falso em {server.url}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
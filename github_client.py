@@ -0,0 +1,140 @@
+"""Cliente HTTP reutilizável para a API GraphQL do GitHub"""
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from token_pool import TokenPool
+
+RETRY_STATUS = {403, 429, 500, 502, 503, 504}
+OPERATION_PATTERN = re.compile(r'(?:query|mutation)\s+(\w+)')
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Backoff exponencial com jitter completo: um valor aleatório entre 0 e base * 2^tentativa"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def rate_limited(status, headers, cost=1):
+    """Limite primário: o token não tem pontos para o custo da query (o pool o estaciona até o reset)"""
+    remaining = headers.get('X-RateLimit-Remaining')
+    return status in (403, 429) and remaining is not None and int(remaining) < cost
+
+
+def retry_delay(response, attempt):
+    """Tempo de espera antes de repetir uma resposta com erro temporário, ou None se não deve repetir"""
+    if response.status_code not in RETRY_STATUS:
+        return None
+    if response.headers.get('Retry-After'):
+        return float(response.headers['Retry-After'])
+    if response.headers.get('X-RateLimit-Remaining') == '0':
+        reset = float(response.headers.get('X-RateLimit-Reset', time.time() + 60))
+        return max(reset - time.time(), 1)
+    if response.status_code == 403 and response.headers.get('X-RateLimit-Remaining') is None:
+        # 403 sem cabeçalhos de limite é erro de permissão, não adianta repetir
+        return None
+    return backoff_delay(attempt)
+
+
+def query_cost(result, estimate=1):
+    """Pontos consumidos pela query: o rateLimit.cost da resposta ou, nas queries que não o pedem
+    (busca, passada única, shards), a estimativa usada para reservar o token"""
+    rate_limit = (result.get('data') or {}).get('rateLimit') or {}
+    return rate_limit.get('cost') or estimate
+
+
+class GitHubGraphQLClient:
+    """Sessão HTTP com keep-alive, compressão gzip e repetição com backoff exponencial e jitter.
+
+    Mantém contadores por operação GraphQL (requisições, repetições, latência e bytes)
+    para mostrar onde o tempo de coleta está sendo gasto. `token` pode ser um único token
+    ou um TokenPool, e nesse caso cada requisição usa o token com mais pontos disponíveis.
+    """
+
+    def __init__(self, token, api_url, max_retries=5, timeout=30, pool_size=16):
+        self.token_pool = token if isinstance(token, TokenPool) else TokenPool([token])
+        self.api_url = api_url
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+
+        self.lock = threading.Lock()
+        self.stats = defaultdict(lambda: {'requests': 0, 'retries': 0, 'failures': 0, 'cost': 0, 'latency': 0.0,
+                                          'max_latency': 0.0, 'bytes': 0})
+
+    def _record(self, operation, latency, response=None, retried=False, failed=False, cost=0):
+        with self.lock:
+            stats = self.stats[operation]
+            stats['requests'] += 1
+            stats['cost'] += cost
+            stats['latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+            stats['retries'] += int(retried)
+            stats['failures'] += int(failed)
+            if response is not None:
+                stats['bytes'] += int(response.headers.get('Content-Length') or len(response.content))
+
+    def execute(self, query, variables=None, cost=1):
+        """Envia a query e retorna o JSON da resposta, repetindo erros temporários.
+
+        `cost` é a estimativa de pontos da query, usada para escolher um token com saldo suficiente.
+        """
+        match = OPERATION_PATTERN.search(query)
+        operation = match.group(1) if match else 'anonymous'
+        request_body = {'query': query, 'variables': variables or {}}
+
+        for attempt in range(self.max_retries + 1):
+            token = self.token_pool.acquire(cost)
+            started = time.perf_counter()
+            response = None
+            try:
+                response = self.session.post(self.api_url, json=request_body, timeout=self.timeout,
+                                             headers={'Authorization': f'bearer {token}'})
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    self._record(operation, time.perf_counter() - started, failed=True)
+                    raise Exception(f"Query falhou após {attempt + 1} tentativas: {e}")
+                self._record(operation, time.perf_counter() - started, retried=True)
+            finally:
+                # A reserva do token volta ao pool em qualquer desfecho, inclusive exceções inesperadas
+                self.token_pool.release(token, response.headers if response is not None else None, cost)
+            if response is None:
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            latency = time.perf_counter() - started
+            if response.status_code == 200:
+                result = response.json()
+                self._record(operation, latency, response, cost=query_cost(result, cost))
+                return result
+
+            delay = retry_delay(response, attempt)
+            if rate_limited(response.status_code, response.headers, cost):
+                # O token sem pontos fica estacionado no pool; a próxima tentativa usa outro ou espera o reset
+                delay = 0
+            if delay is None or attempt == self.max_retries:
+                self._record(operation, latency, response, failed=True)
+                raise Exception(f"Query falhou com o código {response.status_code}:\n{response.text}")
+            self._record(operation, latency, response, retried=True)
+            time.sleep(delay)
+
+    def print_stats(self):
+        """Imprime os contadores de requisições por operação"""
+        print(f"\n{'Operação':<26}{'Req.':>7}{'Repet.':>8}{'Falhas':>8}{'Pontos':>8}{'Lat. média':>12}{'Lat. máx.':>11}"
+              f"{'KB':>10}")
+        for operation, stats in sorted(self.stats.items()):
+            mean_latency = stats['latency'] / stats['requests'] if stats['requests'] else 0
+            print(f"{operation:<26}{stats['requests']:>7}{stats['retries']:>8}{stats['failures']:>8}{stats['cost']:>8}"
+                  f"{mean_latency:>11.3f}s{stats['max_latency']:>10.3f}s{stats['bytes'] / 1024:>10.1f}")
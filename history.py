@@ -0,0 +1,147 @@
+"""Modo de histórico: pagina releases, PRs mescladas e issues fechadas de cada repositório para medir cadências reais"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from metrics import SECONDS_PER_DAY, github_timestamps
+from queries import GET_REPO_CLOSED_ISSUES_QUERY, GET_REPO_MERGED_PRS_QUERY, GET_REPO_RELEASES_QUERY
+
+HISTORY_QUERIES = {
+    'releases': GET_REPO_RELEASES_QUERY,
+    'merged_prs': GET_REPO_MERGED_PRS_QUERY,
+    'closed_issues': GET_REPO_CLOSED_ISSUES_QUERY,
+}
+DAYS_PER_MONTH = 30.44
+
+HISTORY_DTYPES = {
+    'nameWithOwner': 'object',
+    'releases_coletadas': 'int64',
+    'dias_entre_releases_mediana': 'float64',
+    'prs_mescladas_coletadas': 'int64',
+    'prs_mescladas_por_mes': 'float64',
+    'issues_fechadas_coletadas': 'int64',
+    'dias_ate_fechar_issue_mediana': 'float64',
+    'historico_completo': 'bool',
+}
+
+
+class RequestBudget:
+    """Orçamento global de requisições, compartilhado por todas as sub-coletas (None = sem limite)"""
+
+    def __init__(self, max_requests=None):
+        self.max_requests = max_requests
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            if self.max_requests is not None and self.used >= self.max_requests:
+                return False
+            self.used += 1
+            return True
+
+
+def crawl_history(run_query, repo_node, kind, budget, max_pages=10):
+    """Pagina uma conexão do repositório; retorna (nós, completo), com completo=False se parou por limite"""
+    variables = {'owner': repo_node['owner']['login'], 'name': repo_node['name'], 'afterCursor': None}
+    nodes = []
+    for _ in range(max_pages):
+        if not budget.take():
+            return nodes, False
+        result = run_query(HISTORY_QUERIES[kind], variables)
+        repository = (result.get('data') or {}).get('repository')
+        if repository is None:
+            raise Exception(f"Erro na API do GitHub: {result.get('errors')}")
+        history = repository['history']
+        nodes.extend(history['nodes'])
+        if not history['pageInfo']['hasNextPage']:
+            return nodes, True
+        variables['afterCursor'] = history['pageInfo']['endCursor']
+    return nodes, False
+
+
+def timestamps(nodes, field):
+    """Datas de um campo dos nós em segundos desde a epoch, ignorando valores ausentes"""
+    return github_timestamps(pd.Series([node[field] for node in nodes if node.get(field)], dtype='string')).to_numpy()
+
+
+def median_days_between(nodes, field):
+    """Mediana, em dias, do intervalo entre eventos consecutivos"""
+    moments = np.sort(timestamps(nodes, field))
+    return float(np.median(np.diff(moments))) / SECONDS_PER_DAY if len(moments) > 1 else np.nan
+
+
+def monthly_throughput(nodes, field):
+    """Eventos por mês na janela coberta pelos nós coletados (mínimo de um mês)"""
+    moments = timestamps(nodes, field)
+    if len(moments) == 0:
+        return 0.0
+    months = (moments.max() - moments.min()) / SECONDS_PER_DAY / DAYS_PER_MONTH
+    return len(moments) / max(months, 1.0)
+
+
+def median_days_to_close(nodes):
+    closed = [node for node in nodes if node.get('createdAt') and node.get('closedAt')]
+    if not closed:
+        return np.nan
+    durations = timestamps(closed, 'closedAt') - timestamps(closed, 'createdAt')
+    return float(np.median(durations)) / SECONDS_PER_DAY
+
+
+def history_row(repo_node, results):
+    """Cadências de um repositório a partir das três sub-coletas"""
+    releases, releases_complete = results['releases']
+    merged_prs, prs_complete = results['merged_prs']
+    closed_issues, issues_complete = results['closed_issues']
+    return {
+        'nameWithOwner': repo_node.get('nameWithOwner') or f"{repo_node['owner']['login']}/{repo_node['name']}",
+        'releases_coletadas': len(releases),
+        'dias_entre_releases_mediana': round(median_days_between(releases, 'createdAt'), 2),
+        'prs_mescladas_coletadas': len(merged_prs),
+        'prs_mescladas_por_mes': round(monthly_throughput(merged_prs, 'mergedAt'), 2),
+        'issues_fechadas_coletadas': len(closed_issues),
+        'dias_ate_fechar_issue_mediana': round(median_days_to_close(closed_issues), 2),
+        'historico_completo': releases_complete and prs_complete and issues_complete,
+    }
+
+
+def history_frame(rows):
+    return pd.DataFrame(rows, columns=list(HISTORY_DTYPES)).astype(HISTORY_DTYPES)
+
+
+def iter_repo_history(repo_nodes, run_query, parallelism=8, max_requests=None, max_pages=10):
+    """Gera as cadências de cada repositório, na ordem de entrada, à medida que as sub-coletas terminam.
+
+    As três sub-coletas de cada repositório rodam em paralelo em um pool de `parallelism` threads,
+    sob um único orçamento de `max_requests` requisições. Só uma janela de `parallelism` repositórios
+    fica em memória, então `repo_nodes` pode ser um gerador de páginas da busca.
+    """
+    budget = RequestBudget(max_requests)
+
+    def resolve(repo_node, futures):
+        try:
+            return history_row(repo_node, {kind: future.result() for kind, future in futures.items()})
+        except Exception as e:
+            print(f"\nERRO ao buscar histórico para {repo_node['owner']['login']}/{repo_node['name']}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        pending = deque()
+        for repo_node in repo_nodes:
+            futures = {kind: executor.submit(crawl_history, run_query, repo_node, kind, budget, max_pages)
+                       for kind in HISTORY_QUERIES}
+            pending.append((repo_node, futures))
+            if len(pending) > parallelism:
+                row = resolve(*pending.popleft())
+                if row is not None:
+                    yield row
+        while pending:
+            row = resolve(*pending.popleft())
+            if row is not None:
+                yield row
+
+    if max_requests is not None and budget.used >= max_requests:
+        print(f"\nAVISO: orçamento de {max_requests} requisições esgotado; parte do histórico ficou incompleta.")
@@ -1,311 +1,771 @@
-import requests
+import argparse
+import functools
 import time
 import os
 import pandas as pd
 from dotenv import load_dotenv
-from datetime import datetime
+from analysis import load_research_stats
+from cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_HOURS, ResponseCache, repo_key
+from github_client import GitHubGraphQLClient
+from history import history_frame, iter_repo_history
+from token_pool import TokenPool
+from profiling import PROFILE, PROFILE_PATH, profiled, run_with_cprofile
+from metrics import METRIC_DTYPES, build_metrics_frame, iter_repo_metrics, missing_metrics, write_metrics_stream
+from queries import (
+    ALL_METRICS,
+    FULL_SELECTION,
+    GET_TOP_REPOS_PAGINATED_QUERY,
+    MAX_NODES_PER_BATCH,
+    REPO_DETAILS_QUERY_BODY,
+    TOP_REPOS_WITH_DETAILS_QUERY_BODY,
+    build_batched_details_query,
+    build_field_selection,
+    estimated_cost,
+)
+from snapshots import SNAPSHOT_DIR, append_snapshot
+from storage import (CSV_PATH, HISTORY_SCHEMA, PARQUET_PATH, default_metrics_path, read_metrics, read_metrics_columns,
+                     write_metrics)
 
 load_dotenv()
 
 GITHUB_TOKEN = os.getenv("TOKEN")
-GITHUB_API_URL = 'https://api.github.com/graphql'
-
-
-GET_TOP_REPOS_PAGINATED_QUERY = """
-query GetTopRepos($afterCursor: String) {
-  search(query: "is:public sort:stars-desc", type: REPOSITORY, first: 100, after: $afterCursor) {
-    nodes {
-      ... on Repository {
-        owner {
-          login
-        }
-        name
-      }
-    }
-    pageInfo {
-      endCursor
-      hasNextPage
-    }
-  }
-}
-"""
-
-GET_REPO_DETAILS_QUERY = """
-query GetRepoDetails($owner: String!, $name: String!) {
-  repository(owner: $owner, name: $name) {
-    nameWithOwner
-    createdAt
-    pushedAt
-    primaryLanguage {
-      name
-    }
-    releases {
-      totalCount
-    }
-    pullRequests(states: MERGED) {
-      totalCount
-    }
-    totalIssues: issues {
-      totalCount
-    }
-    closedIssues: issues(states: CLOSED) {
-      totalCount
-    }
-  }
-}
-"""
-
-def run_graphql_repo_query(query, variables=None):
-  
-    if not GITHUB_TOKEN:
-        raise Exception("Token do GitHub não encontrado. Configure a variável de ambiente GITHUB_TOKEN.")
-
-    headers = {
-        'Authorization': f'bearer {GITHUB_TOKEN}',
-        'Content-Type': 'application/json',
-    }
-    
-    request_body = {'query': query, 'variables': variables or {}}
-    
-    response = requests.post(GITHUB_API_URL, headers=headers, json=request_body, timeout=30)
+# Vários tokens separados por vírgula; cada requisição usa o que tiver mais pontos disponíveis
+GITHUB_TOKENS = [token.strip() for token in os.getenv("TOKENS", "").split(",") if token.strip()] or \
+    ([GITHUB_TOKEN] if GITHUB_TOKEN else [])
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", 'https://api.github.com/graphql')
 
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Query falhou com o código {response.status_code}:\n{response.text}")
 
+HISTORY_PATH = "repo_history.parquet"
 
-def get_all_top_repos(total_to_fetch=1000):
-    """Busca repositórios em lotes de 100 até atingir o total desejado."""
-    all_repo_nodes = []
+_client = None
+_token_pool = None
+
+
+def get_token_pool():
+    """Pool de tokens compartilhado entre o cliente síncrono e o coletor assíncrono"""
+    global _token_pool
+    if _token_pool is None:
+        _token_pool = TokenPool(GITHUB_TOKENS)
+    return _token_pool
+
+
+def get_client():
+    """Cliente HTTP compartilhado, criado na primeira requisição"""
+    global _client
+    if _client is None:
+        _client = GitHubGraphQLClient(get_token_pool(), GITHUB_API_URL)
+    return _client
+
+
+@profiled(count_rows=False)
+def run_graphql_repo_query(query, variables=None, cost=1):
+
+    if not GITHUB_TOKENS:
+        raise Exception("Token do GitHub não encontrado. Configure a variável de ambiente TOKEN (ou TOKENS).")
+
+    return get_client().execute(query, variables, cost)
+
+
+def iter_top_repo_pages(total_to_fetch=1000, with_details=False, page_size=100, cache=None,
+                        search_query=None, progress=True, selection=FULL_SELECTION):
+    """Gera as páginas da busca, uma lista de repositórios por requisição, até atingir o total desejado.
+
+    Com cache, cada página fica guardada pelo seu cursor e uma coleta reiniciada não repete as requisições.
+    Com detalhes, só os campos de `selection` são pedidos.
+    """
+    fetched = 0
     after_cursor = None
-    
-    print(f"Iniciando coleta de {total_to_fetch} repositórios (em lotes de 100)...")
 
-    while len(all_repo_nodes) < total_to_fetch:
-        variables = {"afterCursor": after_cursor}
-        result = run_graphql_repo_query(GET_TOP_REPOS_PAGINATED_QUERY, variables)
-        
+    while fetched < total_to_fetch:
+        if with_details:
+            query = TOP_REPOS_WITH_DETAILS_QUERY_BODY + selection.fragment
+            variables = {"afterCursor": after_cursor, "pageSize": min(page_size, total_to_fetch - fetched)}
+        else:
+            query = GET_TOP_REPOS_PAGINATED_QUERY
+            variables = {"afterCursor": after_cursor}
+        if search_query:
+            variables["searchQuery"] = search_query
+
+        cache_key = f"search:{search_query or ''}:{after_cursor or ''}:{variables.get('pageSize', 100)}"
+        result = cache.get(cache_key, query) if cache else None
+        from_cache = result is not None
+        if not from_cache:
+            cost = estimated_cost(variables['pageSize'], selection.node_cost) if with_details else 1
+            result = run_graphql_repo_query(query, variables, cost)
+
         if 'errors' in result:
             raise Exception(f"Erro na API do GitHub: {result['errors']}")
-            
+        if cache and not from_cache:
+            cache.set(cache_key, query, result)
+
         search_data = result['data']['search']
-        new_nodes = search_data['nodes']
+        new_nodes = search_data['nodes'][:total_to_fetch - fetched]
         page_info = search_data['pageInfo']
-        
-        all_repo_nodes.extend(new_nodes)
+
+        fetched += len(new_nodes)
         after_cursor = page_info['endCursor']
-        
-        progress = (len(all_repo_nodes) / total_to_fetch) * 100
-        print(f"\rColetados {len(all_repo_nodes)} de {total_to_fetch} repositórios ({progress:.1f}%)", end='', flush=True)
+
+        if progress:
+            print(f"\rColetados {fetched} de {total_to_fetch} repositórios ({fetched / total_to_fetch * 100:.1f}%)",
+                  end='', flush=True)
+
+        yield new_nodes
 
         if not page_info['hasNextPage']:
-            print("\nNão há mais páginas para buscar. Fim da coleta.")
+            if progress:
+                print("\nNão há mais páginas para buscar. Fim da coleta.")
             break
-        
-        time.sleep(0.1) # Pequena pausa entre as requisições 
-
-    print() 
-    return all_repo_nodes[:total_to_fetch]
-
-def get_repo_details(query, data):
-"""Busca todo o conteudo solicitado na requisição dos repositorios """
-  
-  all_repo_data = []
-  total_repos = len(data)
-  
-  print(f"Buscando detalhes para {total_repos} repositórios...")
-  
-  for i, repo_node in enumerate(data, 1):
-    owner = repo_node['owner']['login']
-    name = repo_node['name']
-    
-    variables = {"owner": owner, "name": name}
+
+        if not from_cache:
+            time.sleep(0.1) # Pequena pausa entre as requisições
+
+    if progress:
+        print()
+
+
+@profiled()
+def get_all_top_repos(total_to_fetch=1000, with_details=False, page_size=100, cache=None, selection=FULL_SELECTION):
+    """Busca repositórios em lotes de 100 até atingir o total desejado."""
+    print(f"Iniciando coleta de {total_to_fetch} repositórios (em lotes de {page_size if with_details else 100})...")
+
+    all_repo_nodes = []
+    for page in iter_top_repo_pages(total_to_fetch, with_details, page_size, cache, selection=selection):
+        all_repo_nodes.extend(page)
+    return all_repo_nodes
+
+@profiled()
+def get_sharded_top_repos(total_to_fetch, with_details=False, page_size=100, cache=None, parallelism=4,
+                          selection=FULL_SELECTION):
+    """Busca mais que os 1000 resultados permitidos pela busca, dividindo-a em faixas de estrelas coletadas em paralelo"""
+    from sharding import ShardPlanner, crawl_shards
+
+    print(f"Planejando shards para {total_to_fetch} repositórios...")
+    shards = ShardPlanner(run_graphql_repo_query).plan(total_to_fetch)
+
+    def fetch_shard(search_query, limit):
+        pages = iter_top_repo_pages(limit, with_details, page_size, cache, search_query, progress=False,
+                                    selection=selection)
+        nodes = [repo_node for page in pages for repo_node in page]
+        print(f"Shard '{search_query}': {len(nodes)} repositórios")
+        return nodes
+
+    return crawl_shards(shards, fetch_shard, total_to_fetch, parallelism)
+
+
+@profiled()
+def get_repo_details(query, data, cache=None, selection=FULL_SELECTION):
+    """Busca todo o conteudo solicitado na requisição dos repositorios """
+
+    all_repo_data = []
+    total_repos = len(data)
+
+    print(f"Buscando detalhes para {total_repos} repositórios...")
+
+    for i, repo_node in enumerate(data, 1):
+        owner = repo_node['owner']['login']
+        name = repo_node['name']
+
+        variables = {"owner": owner, "name": name}
+        try:
+            details_result = run_graphql_repo_query(query, variables)
+            if 'data' in details_result and details_result['data'].get('repository'):
+                repo_details = details_result['data']['repository']
+                all_repo_data.append(repo_details)
+                if cache:
+                    cache.set(repo_key(repo_node), selection.fragment, repo_details)
+            else:
+                print(f"\nAVISO: Não foi possível obter detalhes para {owner}/{name}. Resposta: {details_result}")
+        except Exception as e:
+            print(f"\nERRO ao buscar detalhes para {owner}/{name}: {e}")
+
+        progress = (i / total_repos) * 100
+        print(f"\rCarregando detalhes {progress:.1f}%", end='', flush=True)
+
+        time.sleep(0.05)
+
+    print()
+    return all_repo_data
+
+
+def fetch_details_batch(batch, cache=None, selection=FULL_SELECTION):
+    """Busca os detalhes de um lote; se a requisição falhar, divide o lote ao meio e tenta cada metade"""
+    query, variables = build_batched_details_query(batch, selection.fragment)
     try:
-        details_result = run_graphql_repo_query(query, variables)
-        if 'data' in details_result and details_result['data'].get('repository'):
-            repo_details = details_result['data']['repository']
-            all_repo_data.append(repo_details)
-        else:
-            print(f"\nAVISO: Não foi possível obter detalhes para {owner}/{name}. Resposta: {details_result}")
+        result = run_graphql_repo_query(query, variables, estimated_cost(len(batch), selection.node_cost))
+        if not result.get('data'):
+            raise Exception(f"Erro na API do GitHub: {result.get('errors')}")
     except Exception as e:
-        print(f"\nERRO ao buscar detalhes para {owner}/{name}: {e}")
-    
-    progress = (i / total_repos) * 100
-    print(f"\rCarregando detalhes {progress:.1f}%", end='', flush=True)
-
-    time.sleep(0.05)
-  
-  print()
-  return all_repo_data
-
-
-def get_repo_metrics(repo_data):
-""" Busca todos os repositorios monta um dataframe e salva em um csv """
-  
-    df_data = []
-    for repo in repo_data:
-        if not repo: continue # Pula repositórios que podem ter falhado na coleta
-        created_at = datetime.fromisoformat(repo['createdAt'].replace('Z', '+00:00')).timestamp()
-        pushed_at = datetime.fromisoformat(repo['pushedAt'].replace('Z', '+00:00')).timestamp()
-        
-        idade_repositorio = (time.time() - created_at) / (60 * 60 * 24)
-        tempo_ate_ultima_atualizacao = (time.time() - pushed_at) / (60 * 60 * 24)
-        pull_requests_aceitas = repo['pullRequests']['totalCount']
-        releases = repo['releases']['totalCount']
-        issues_fechadas = repo['closedIssues']['totalCount']
-        total_issues = repo['totalIssues']['totalCount']
-        taxa_resolucao_issues = (issues_fechadas / total_issues * 100) if total_issues > 0 else 0
-        
-        df_data.append({
-            'nameWithOwner': repo['nameWithOwner'],
-            'idade_repositorio_dias': round(idade_repositorio, 2),
-            'pull_requests_aceitas': pull_requests_aceitas,
-            'releases': releases,
-            'tempo_ate_ultima_atualizacao_dias': round(tempo_ate_ultima_atualizacao, 2),
-            'linguagem_primaria': repo['primaryLanguage']['name'] if repo['primaryLanguage'] else 'N/A',
-            'issues_fechadas': issues_fechadas,
-            'total_issues': total_issues,
-            'taxa_resolucao_issues_pct': round(taxa_resolucao_issues, 2),
-            'atividade_recente': 'Ativo' if tempo_ate_ultima_atualizacao <= 30 else 'Inativo',
-            'maturidade': 'Maduro' if idade_repositorio > 365 else 'Jovem'
-        })
-
-    df = pd.DataFrame(df_data)
-    df.to_csv("repo_metrics.csv", index=False)
+        if len(batch) == 1:
+            repo_node = batch[0]
+            print(f"\nERRO ao buscar detalhes para {repo_node['owner']['login']}/{repo_node['name']}: {e}")
+            return []
+        middle = len(batch) // 2
+        return fetch_details_batch(batch[:middle], cache, selection) + fetch_details_batch(batch[middle:], cache, selection)
+
+    batch_data = []
+    cache_items = []
+    for i, repo_node in enumerate(batch):
+        repo_details = result['data'].get(f"r{i}")
+        if repo_details:
+            batch_data.append(repo_details)
+            cache_items.append((repo_key(repo_node), repo_details))
+        else:
+            print(f"\nAVISO: Não foi possível obter detalhes para {repo_node['owner']['login']}/{repo_node['name']}.")
+    if cache:
+        cache.set_many(cache_items, selection.fragment)
+    return batch_data
+
+
+@profiled()
+def get_repo_details_batched(data, batch_size=50, max_nodes=MAX_NODES_PER_BATCH, cache=None, selection=FULL_SELECTION):
+    """Busca os detalhes dos repositórios em lotes, respeitando o limite de nós por requisição"""
+    batch_size = max(1, min(batch_size, max_nodes // selection.node_cost))
+    all_repo_data = []
+    total_repos = len(data)
+
+    print(f"Buscando detalhes para {total_repos} repositórios (em lotes de {batch_size})...")
+
+    for start in range(0, total_repos, batch_size):
+        batch = data[start:start + batch_size]
+        all_repo_data.extend(fetch_details_batch(batch, cache, selection))
+
+        progress = (min(start + batch_size, total_repos) / total_repos) * 100
+        print(f"\rCarregando detalhes {progress:.1f}%", end='', flush=True)
+
+        time.sleep(0.05)
+
+    print()
+    return all_repo_data
+
+
+def get_repo_details_with_cache(data, fetch, cache, selection=FULL_SELECTION):
+    """Separa os repositórios já guardados no cache e busca só os que faltam, mantendo a ordem original"""
+    cached = {}
+    missing = []
+    for repo_node in data:
+        repo_details = cache.get(repo_key(repo_node), selection.fragment)
+        if repo_details is None:
+            missing.append(repo_node)
+        else:
+            cached[repo_key(repo_node)] = repo_details
+
+    print(f"{len(cached)} repositórios recuperados do cache, {len(missing)} a buscar.")
+    fetched = fetch(missing) if missing else []
+
+    by_name = {repo['nameWithOwner'].lower(): repo for repo in fetched}
+    by_name.update(cached)
+    ordered = [by_name.pop(repo_key(repo_node)) for repo_node in data if repo_key(repo_node) in by_name]
+    return ordered + list(by_name.values())
+
+
+def stored_repo_record(row):
+    """Converte uma linha do dataset salvo de volta para o formato retornado pela API"""
+    return {
+        'nameWithOwner': row['nameWithOwner'],
+        'createdAt': row['created_at'],
+        'pushedAt': row['pushed_at'],
+        'primaryLanguage': ({'name': row['linguagem_primaria']}
+                            if pd.notna(row['linguagem_primaria']) and row['linguagem_primaria'] != 'N/A' else None),
+        'releases': {'totalCount': row['releases']},
+        'pullRequests': {'totalCount': row['pull_requests_aceitas']},
+        'totalIssues': {'totalCount': row['total_issues']},
+        'closedIssues': {'totalCount': row['issues_fechadas']},
+    }
+
+
+def refresh_repo_data(total_to_fetch, fetch, path=None, list_repos=get_all_top_repos):
+    """Compara o top-N atual com o dataset salvo e busca detalhes só dos repositórios novos
+    ou cujo pushedAt avançou; os demais são reaproveitados do dataset.
+
+    `list_repos(total)` lista o top-N (get_sharded_top_repos para mais de 1000). Uma listagem mais curta
+    que o total é recusada: os repositórios ausentes seriam apagados do dataset como se tivessem saído do top."""
+    path = path or default_metrics_path()
+    stored = read_metrics(path)
+    for column in ('created_at', 'pushed_at'):
+        # Datasets anteriores às colunas de datas (ou linhas sem elas) são buscados de novo
+        stored[column] = stored[column].astype(object).fillna('') if column in stored.columns else ''
+    stored_rows = {row['nameWithOwner'].lower(): row for row in stored.to_dict('records')}
+
+    # A busca é sempre feita na rede: o cache de páginas não reflete mudanças no ranking
+    repo_nodes = list_repos(total_to_fetch)
+    if len(repo_nodes) < total_to_fetch:
+        raise Exception(f"A listagem retornou {len(repo_nodes)} de {total_to_fetch} repositórios; {path} não foi "
+                        f"alterado (para mais de 1000 repositórios use --sharded).")
+    changed = []
+    for repo_node in repo_nodes:
+        row = stored_rows.get(repo_key(repo_node))
+        if row is None or not row['pushed_at'] or repo_node['pushedAt'] > row['pushed_at']:
+            changed.append(repo_node)
+
+    current = {repo_key(repo_node) for repo_node in repo_nodes}
+    leavers = len(set(stored_rows) - current)
+    print(f"Atualização incremental: {len(changed)} repositórios novos ou alterados, "
+          f"{len(repo_nodes) - len(changed)} sem mudanças, {leavers} saíram do top {total_to_fetch}.")
+
+    fetched = {repo['nameWithOwner'].lower(): repo for repo in fetch(changed)} if changed else {}
+    repo_data = []
+    for repo_node in repo_nodes:
+        key = repo_key(repo_node)
+        if key in fetched:
+            repo_data.append(fetched[key])
+        elif key in stored_rows and stored_rows[key]['pushed_at']:
+            repo_data.append(stored_repo_record(stored_rows[key]))
+    return repo_data
+
+
+def save_metrics(df, path=None):
+    """Grava o dataset em `path`; o dataset padrão sai em Parquet e também no CSV de exportação"""
+    if path in (None, PARQUET_PATH, CSV_PATH):
+        write_metrics(df, PARQUET_PATH)
+        write_metrics(df, CSV_PATH)
+    else:
+        write_metrics(df, path)
+
+
+@profiled()
+def get_repo_metrics(repo_data, metrics=None):
+    """ Busca todos os repositorios monta um dataframe e salva em um csv """
+
+    df = build_metrics_frame(repo_data, metrics=metrics)
+    save_metrics(df)
+    return df
+
+
+def details_fetcher(args, cache=None, selection=FULL_SELECTION):
+    """Função que busca os detalhes de uma lista de repositórios no modo escolhido (assíncrono, em lotes ou um a um)"""
+    if args.use_async:
+        from async_collector import get_repo_details_async
+        return lambda nodes: get_repo_details_async(nodes, get_token_pool(), GITHUB_API_URL, args.concurrency,
+                                                    args.batch_size, args.max_nodes, cache, selection)
+    if args.batch_size > 1:
+        return lambda nodes: get_repo_details_batched(nodes, args.batch_size, args.max_nodes, cache, selection)
+    return lambda nodes: get_repo_details(REPO_DETAILS_QUERY_BODY + selection.fragment, nodes, cache, selection)
+
+
+def missing_metric_groups(metrics=ALL_METRICS, path=None):
+    """Grupos de `metrics` com alguma coluna ausente do dataset salvo (ex.: coletado antes com --metrics)"""
+    return missing_metrics(read_metrics_columns(path), metrics)
+
+
+@profiled()
+def backfill_metrics(missing, fetch, cache=None, path=None):
+    """Busca só os campos das métricas `missing` para os repositórios do dataset salvo e acrescenta as colunas.
+
+    `fetch` deve buscar com build_field_selection(missing), a mesma seleção usada como chave do cache.
+    Se algum repositório ficar sem detalhes, nada é gravado: o dataset salvo só é reescrito completo.
+    Com o cache ligado, uma nova tentativa busca apenas os que faltaram.
+    """
+    stored = read_metrics(path)
+    print(f"Completando o dataset salvo ({len(stored)} repositórios) com as métricas: {', '.join(missing)}")
+    repo_nodes = []
+    for name_with_owner in stored['nameWithOwner']:
+        owner, name = name_with_owner.split('/', 1)
+        repo_nodes.append({'owner': {'login': owner}, 'name': name, 'nameWithOwner': name_with_owner})
+    selection = build_field_selection(missing)
+    repo_data = get_repo_details_with_cache(repo_nodes, fetch, cache, selection) if cache else fetch(repo_nodes)
+
+    fetched = build_metrics_frame(repo_data, metrics=missing)
+    fetched['nameWithOwner'] = fetched['nameWithOwner'].astype(stored['nameWithOwner'].dtype)
+    stored = stored.drop(columns=[column for column in fetched.columns if column != 'nameWithOwner' and column in stored])
+    without_details = len(stored) - stored['nameWithOwner'].isin(fetched['nameWithOwner']).sum()
+    if without_details:
+        raise Exception(f"{without_details} de {len(stored)} repositórios ficaram sem detalhes; "
+                        "o dataset salvo não foi alterado.")
+    df = stored.merge(fetched, on='nameWithOwner', how='left')
+    df = df[[column for column in METRIC_DTYPES if column in df.columns]]
+
+    save_metrics(df, path)
     return df
 
 
-def get_df_metrics():
-  """ Pega dataframe do csv e faz uma analise geral """
-  
-    df = pd.read_csv("repo_metrics.csv")
-    issues_fechadas_por_total = df['issues_fechadas'].sum() / df['total_issues'].sum() if df['total_issues'].sum() > 0 else 0
+def iter_repo_details(pages, batch_size=50, max_nodes=MAX_NODES_PER_BATCH, cache=None, selection=FULL_SELECTION):
+    """Enriquece cada página da busca com os detalhes assim que ela chega, sem acumular a lista completa"""
+    batch_size = max(1, min(batch_size, max_nodes // selection.node_cost))
+    for page in pages:
+        for start in range(0, len(page), batch_size):
+            batch = page[start:start + batch_size]
+            details = {}
+            if cache:
+                for repo_node in batch:
+                    repo_details = cache.get(repo_key(repo_node), selection.fragment)
+                    if repo_details is not None:
+                        details[repo_key(repo_node)] = repo_details
+
+            missing = [repo_node for repo_node in batch if repo_key(repo_node) not in details]
+            if missing:
+                for repo_details in fetch_details_batch(missing, cache, selection):
+                    details[repo_details['nameWithOwner'].lower()] = repo_details
+
+            for repo_node in batch:
+                if repo_key(repo_node) in details:
+                    yield details[repo_key(repo_node)]
+
+
+@profiled()
+def get_repo_history(total_to_fetch, path=HISTORY_PATH, parallelism=8, max_requests=None, max_pages=10):
+    """Modo de histórico: pagina releases, PRs mescladas e issues fechadas do top `total_to_fetch`
+    e grava as cadências em blocos, à medida que cada repositório termina"""
+    print(f"Iniciando coleta do histórico de {total_to_fetch} repositórios "
+          f"(até {max_pages} páginas por conexão, {parallelism} sub-coletas simultâneas)...")
+    pages = iter_top_repo_pages(total_to_fetch, progress=False)
+    repo_nodes = (repo_node for page in pages for repo_node in page)
+    rows = iter_repo_history(repo_nodes, run_graphql_repo_query, parallelism, max_requests, max_pages)
+    total = write_metrics_stream(rows, path, frame=history_frame, schema=HISTORY_SCHEMA)
+    print(f"\nHistórico de {total} repositórios gravado em {path}")
+
+    history = read_metrics(path)
+    print(f"Mediana de dias entre releases: {history['dias_entre_releases_mediana'].median():.2f}")
+    print(f"Mediana de PRs mescladas por mês: {history['prs_mescladas_por_mes'].median():.2f}")
+    print(f"Mediana do tempo até fechar uma issue (dias): {history['dias_ate_fechar_issue_mediana'].median():.2f}")
+    print(f"Repositórios com histórico completo: {int(history['historico_completo'].sum())} de {len(history)}")
+    return history
+
+
+@profiled(count_rows=False)
+def get_df_metrics(stats=None):
+    """ Pega dataframe do csv e faz uma analise geral """
+
+    stats = stats or load_research_stats()
+    issues_fechadas_por_total = stats.issues_fechadas_soma / stats.total_issues_soma if stats.total_issues_soma > 0 else 0
     return {
-        "idade_repositorio": f"{df['idade_repositorio_dias'].mean():.2f} Dias",
-        "total_pull_requests_aceitas": f"{df['pull_requests_aceitas'].mean():.2f}",
-        "total_releases": f"{df['releases'].mean():.2f}",
-        "tempo_ate_ultima_atualizacao": f"{df['tempo_ate_ultima_atualizacao_dias'].mean():.2f} Dias",
-        "linguagem_primaria": df['linguagem_primaria'].mode().iloc[0] if not df['linguagem_primaria'].mode().empty else 'N/A',
-        "issues_fechadas": f"{df['issues_fechadas'].sum()}",
-        "total_issues": f"{df['total_issues'].sum()}",
+        "idade_repositorio": f"{stats.idade_media:.2f} Dias",
+        "total_pull_requests_aceitas": f"{stats.prs_media:.2f}",
+        "total_releases": f"{stats.releases_media:.2f}",
+        "tempo_ate_ultima_atualizacao": f"{stats.atualizacao_media:.2f} Dias",
+        "linguagem_primaria": stats.linguagem_mais_comum,
+        "issues_fechadas": f"{stats.issues_fechadas_soma}",
+        "total_issues": f"{stats.total_issues_soma}",
         "issues_fechadas_por_total": f"{issues_fechadas_por_total:.2f}%",
-        "taxa_resolucao_media": f"{df['taxa_resolucao_issues_pct'].mean():.2f}%",
-        "repos_ativos": f"{len(df[df['atividade_recente'] == 'Ativo'])} de {len(df)}",
-        "repos_maduros": f"{len(df[df['maturidade'] == 'Maduro'])} de {len(df)}"
+        "taxa_resolucao_media": f"{stats.taxa_resolucao_media:.2f}%",
+        "repos_ativos": f"{stats.repos_ativos} de {stats.total}",
+        "repos_maduros": f"{stats.repos_maduros} de {stats.total}"
     }
 
-def metrics_analysis():
-  """ Faz a analise para cada um dos repositórios do dataframe """
-  
-   df = pd.read_csv("repo_metrics.csv")
-   print("\n" + "="*80)
-   print("ANÁLISE DAS QUESTÕES DE PESQUISA")
-   print("="*80)
-   print("\nRQ01: Sistemas populares são maduros/antigos?")
-   print("-" * 50)
-   idade_mediana = df['idade_repositorio_dias'].median()
-   idade_media = df['idade_repositorio_dias'].mean()
-   print(f"Mediana da idade: {idade_mediana:.2f} dias ({idade_mediana/365:.2f} anos)")
-   print(f"Média da idade: {idade_media:.2f} dias ({idade_media/365:.2f} anos)")
-   print(f"Repositórios maduros (>1 ano): {len(df[df['maturidade'] == 'Maduro'])} de {len(df)}")
-   print("\nRQ02: Sistemas populares recebem muita contribuição externa?")
-   print("-" * 50)
-   prs_mediana = df['pull_requests_aceitas'].median()
-   prs_media = df['pull_requests_aceitas'].mean()
-   print(f"Mediana de PRs aceitas: {prs_mediana:.0f}")
-   print(f"Média de PRs aceitas: {prs_media:.2f}")
-   print("\nRQ03: Sistemas populares lançam releases com frequência?")
-   print("-" * 50)
-   releases_mediana = df['releases'].median()
-   releases_media = df['releases'].mean()
-   print(f"Mediana de releases: {releases_mediana:.0f}")
-   print(f"Média de releases: {releases_media:.2f}")
-   repos_com_releases = len(df[df['releases'] > 0])
-   print(f"Repositórios com releases: {repos_com_releases} de {len(df)} ({repos_com_releases/len(df)*100:.1f}%)")
-   print("\nRQ04: Sistemas populares são atualizados com frequência?")
-   print("-" * 50)
-   atualizacao_mediana = df['tempo_ate_ultima_atualizacao_dias'].median()
-   atualizacao_media = df['tempo_ate_ultima_atualizacao_dias'].mean()
-   print(f"Mediana do tempo desde última atualização: {atualizacao_mediana:.2f} dias")
-   print(f"Média do tempo desde última atualização: {atualizacao_media:.2f} dias")
-   print(f"Repositórios ativos (atualizados nos últimos 30 dias): {len(df[df['atividade_recente'] == 'Ativo'])} de {len(df)}")
-   print("\nRQ05: Sistemas populares são escritos nas linguagens mais populares?")
-   print("-" * 50)
-   linguagens_count = df['linguagem_primaria'].value_counts()
-   print("Contagem por linguagem:")
-   for linguagem, count in linguagens_count.items():
-     print(f" {linguagem}: {count} repositório(s) ({count/len(df)*100:.1f}%)")
-   print("\nRQ06: Sistemas populares possuem um alto percentual de issues fechadas?")
-   print("-" * 50)
-   df_com_issues = df[df['total_issues'] > 0]
-   if len(df_com_issues) > 0:
-     taxa_mediana = df_com_issues['taxa_resolucao_issues_pct'].median()
-     taxa_media = df_com_issues['taxa_resolucao_issues_pct'].mean()
-     print(f"Mediana da taxa de resolução: {taxa_mediana:.2f}%")
-     print(f"Média da taxa de resolução: {taxa_media:.2f}%")
-     print(f"Repositórios com alta resolução (>80%): {len(df_com_issues[df_com_issues['taxa_resolucao_issues_pct'] > 80])} de {len(df_com_issues)}")
-   else:
-     print("Nenhum repositório com issues encontrado.")
-   return df
-
-def per_language_analysis():
-  """ Analisa as estatísticas categorizando por linguagem  """
-  
-   df = pd.read_csv("repo_metrics.csv")
-   print("\n" + "="*80)
-   print("RQ07: ANÁLISE POR LINGUAGEM (BÔNUS)")
-   print("="*80)
-   print("\nEstatísticas por linguagem:")
-   print("-" * 50)
-   for linguagem in df['linguagem_primaria'].unique():
-     if linguagem == 'N/A' or pd.isna(linguagem):
-       continue
-     subset = df[df['linguagem_primaria'] == linguagem]
-     linguagem_safe = str(linguagem) if linguagem is not None else 'Unknown'
-     print(f"\n{linguagem_safe.upper()}:")
-     print(f" Número de repositórios: {len(subset)}")
-     print(f" PRs aceitas - Mediana: {subset['pull_requests_aceitas'].median():.0f}, Média: {subset['pull_requests_aceitas'].mean():.2f}")
-     print(f" Releases - Mediana: {subset['releases'].median():.0f}, Média: {subset['releases'].mean():.2f}")
-     print(f" Dias desde última atualização - Mediana: {subset['tempo_ate_ultima_atualizacao_dias'].median():.2f}, Média: {subset['tempo_ate_ultima_atualizacao_dias'].mean():.2f}")
-   print(f"\nAnálise por linguagem concluída!")
-   return df
+@profiled()
+def metrics_analysis(stats=None):
+    """ Faz a analise para cada um dos repositórios do dataframe """
+
+    stats = stats or load_research_stats()
+    print("\n" + "="*80)
+    print("ANÁLISE DAS QUESTÕES DE PESQUISA")
+    print("="*80)
+    print("\nRQ01: Sistemas populares são maduros/antigos?")
+    print("-" * 50)
+    print(f"Mediana da idade: {stats.idade_mediana:.2f} dias ({stats.idade_mediana/365:.2f} anos)")
+    print(f"Média da idade: {stats.idade_media:.2f} dias ({stats.idade_media/365:.2f} anos)")
+    print(f"Repositórios maduros (>1 ano): {stats.repos_maduros} de {stats.total}")
+    print("\nRQ02: Sistemas populares recebem muita contribuição externa?")
+    print("-" * 50)
+    print(f"Mediana de PRs aceitas: {stats.prs_mediana:.0f}")
+    print(f"Média de PRs aceitas: {stats.prs_media:.2f}")
+    print("\nRQ03: Sistemas populares lançam releases com frequência?")
+    print("-" * 50)
+    print(f"Mediana de releases: {stats.releases_mediana:.0f}")
+    print(f"Média de releases: {stats.releases_media:.2f}")
+    print(f"Repositórios com releases: {stats.repos_com_releases} de {stats.total} ({stats.repos_com_releases/stats.total*100:.1f}%)")
+    print("\nRQ04: Sistemas populares são atualizados com frequência?")
+    print("-" * 50)
+    print(f"Mediana do tempo desde última atualização: {stats.atualizacao_mediana:.2f} dias")
+    print(f"Média do tempo desde última atualização: {stats.atualizacao_media:.2f} dias")
+    print(f"Repositórios ativos (atualizados nos últimos 30 dias): {stats.repos_ativos} de {stats.total}")
+    print("\nRQ05: Sistemas populares são escritos nas linguagens mais populares?")
+    print("-" * 50)
+    print("Contagem por linguagem:")
+    for linguagem, count in stats.linguagens_count.items():
+        print(f" {linguagem}: {count} repositório(s) ({count/stats.total*100:.1f}%)")
+    print("\nRQ06: Sistemas populares possuem um alto percentual de issues fechadas?")
+    print("-" * 50)
+    if stats.repos_com_issues > 0:
+        print(f"Mediana da taxa de resolução: {stats.taxa_mediana:.2f}%")
+        print(f"Média da taxa de resolução: {stats.taxa_media:.2f}%")
+        print(f"Repositórios com alta resolução (>80%): {stats.repos_alta_resolucao} de {stats.repos_com_issues}")
+    else:
+        print("Nenhum repositório com issues encontrado.")
+    return stats.df
+
+@profiled()
+def per_language_analysis(stats=None):
+    """ Analisa as estatísticas categorizando por linguagem  """
+
+    stats = stats or load_research_stats()
+    print("\n" + "="*80)
+    print("RQ07: ANÁLISE POR LINGUAGEM (BÔNUS)")
+    print("="*80)
+    print("\nEstatísticas por linguagem:")
+    print("-" * 50)
+    for linha in stats.por_linguagem.itertuples():
+        print(f"\n{str(linha.Index).upper()}:")
+        print(f" Número de repositórios: {linha.repositorios}")
+        print(f" PRs aceitas - Mediana: {linha.prs_mediana:.0f}, Média: {linha.prs_media:.2f}")
+        print(f" Releases - Mediana: {linha.releases_mediana:.0f}, Média: {linha.releases_media:.2f}")
+        print(f" Dias desde última atualização - Mediana: {linha.atualizacao_mediana:.2f}, Média: {linha.atualizacao_media:.2f}")
+    print(f"\nAnálise por linguagem concluída!")
+    return stats.df
+
+@profiled(count_rows=False)
+def partial_metrics_analysis(missing, path=None):
+    """ Resumo das colunas disponíveis quando o dataset ainda não tem todas as métricas (coleta com --metrics) """
+
+    df = read_metrics(path)
+    print("\n" + "="*80)
+    print("RESUMO DAS MÉTRICAS COLETADAS")
+    print("="*80)
+    print(f"Repositórios: {len(df)}")
+    for column in df.columns:
+        if column in ('nameWithOwner', 'created_at', 'pushed_at'):
+            continue
+        if pd.api.types.is_numeric_dtype(df[column]):
+            print(f"{column} - Mediana: {df[column].median():.2f}, Média: {df[column].mean():.2f}")
+        else:
+            counts = df[column].value_counts().head(5)
+            print(f"{column}: " + ", ".join(f"{value} ({count})" for value, count in counts.items()))
+    print(f"\nAs questões de pesquisa também precisam de: {', '.join(missing)}. "
+          "Rode com --backfill para buscá-las.")
+
+
+def metrics_arg(value):
+    """Valida a lista de --metrics no próprio argparse, para um erro de linha de comando em vez de um traceback"""
+    metrics = [metric.strip() for metric in value.split(",") if metric.strip()]
+    unknown = sorted(set(metrics) - set(ALL_METRICS))
+    if unknown:
+        raise argparse.ArgumentTypeError(f"métricas desconhecidas: {', '.join(unknown)} (opções: {', '.join(ALL_METRICS)})")
+    if not metrics:
+        raise argparse.ArgumentTypeError(f"nenhuma métrica informada (opções: {', '.join(ALL_METRICS)})")
+    return metrics
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Coleta e análise dos repositórios mais populares do GitHub")
+    parser.add_argument("--total", type=int, default=1000, help="Quantidade de repositórios a coletar")
+    parser.add_argument("--batch-size", type=int, default=50,
+                        help="Repositórios por requisição de detalhes (1 = uma requisição por repositório)")
+    parser.add_argument("--single-pass", action="store_true",
+                        help="Traz os detalhes na própria busca paginada, sem uma segunda passada por repositório")
+    parser.add_argument("--page-size", type=int, default=100,
+                        help="Repositórios por página da busca no modo --single-pass")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Busca os detalhes de forma assíncrona, com várias requisições simultâneas")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Máximo de requisições simultâneas no modo --async")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH,
+                        help="Arquivo SQLite com as respostas já coletadas")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_HOURS,
+                        help="Validade do cache em horas (0 desativa o cache)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Atualiza o dataset salvo buscando só repositórios novos ou com novos pushes")
+    parser.add_argument("--stream", action="store_true",
+                        help="Processa página a página e grava o dataset em blocos, sem manter tudo em memória")
+    parser.add_argument("--output", default="repo_metrics.csv",
+                        help="Arquivo de saída do modo --stream (.csv ou .parquet)")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Divide a busca em faixas de estrelas para coletar mais de 1000 repositórios")
+    parser.add_argument("--shard-parallelism", type=int, default=4,
+                        help="Shards coletados ao mesmo tempo no modo --sharded")
+    parser.add_argument("--metrics", type=metrics_arg, default=None,
+                        help=f"Métricas a coletar, separadas por vírgula ({','.join(ALL_METRICS)}; padrão: todas). "
+                             "Só os campos delas são pedidos à API; as que faltarem no dataset salvo são buscadas")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Busca só as métricas (de --metrics, ou todas) que faltam no dataset salvo e as acrescenta")
+    parser.add_argument("--max-nodes", type=int, default=MAX_NODES_PER_BATCH,
+                        help="Limite estimado de nós GraphQL por requisição em lote")
+    parser.add_argument("--history", action="store_true",
+                        help="Pagina releases, PRs mescladas e issues fechadas de cada repositório para medir cadências")
+    parser.add_argument("--history-output", default=HISTORY_PATH,
+                        help="Arquivo de saída do modo --history (.parquet ou .csv)")
+    parser.add_argument("--history-pages", type=int, default=10,
+                        help="Máximo de páginas (de 100 itens) por conexão de cada repositório")
+    parser.add_argument("--history-requests", type=int, default=None,
+                        help="Orçamento total de requisições do modo --history (padrão: sem limite)")
+    parser.add_argument("--history-parallelism", type=int, default=8,
+                        help="Sub-coletas de histórico executadas ao mesmo tempo")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Guarda o dataset desta execução como o snapshot do dia no histórico particionado")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR,
+                        help="Diretório do histórico de snapshots (Parquet particionado por data)")
+    parser.add_argument("--recortes", action="store_true",
+                        help="Calcula IC por bootstrap, Spearman e Mann–Whitney por linguagem × maturidade × atividade")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processos usados no modo --recortes (padrão: núcleos disponíveis)")
+    parser.add_argument("--profile-output", default=PROFILE_PATH,
+                        help="Arquivo JSON com o perfil da execução (tempo por etapa, requisições, pontos e bytes)")
+    parser.add_argument("--cprofile", metavar="ARQUIVO",
+                        help="Executa sob o cProfile e grava as estatísticas neste arquivo (.prof)")
+    args = parser.parse_args()
+    # O modo --stream tem o próprio caminho de coleta: ignorar essas opções em silêncio faria uma coleta diferente da pedida
+    if args.stream and args.incremental:
+        parser.error("--incremental não funciona com --stream (a atualização reaproveita o dataset salvo em memória)")
+    if args.stream and args.use_async:
+        parser.error("--async não funciona com --stream (o fluxo busca os detalhes página a página, em lotes)")
+    return args
+
+
+def report_profile(path=PROFILE_PATH):
+    """Junta os contadores do cliente e do pool de tokens ao perfil, grava o JSON e imprime o resumo"""
+    if _client is not None:
+        PROFILE.add_request_stats(_client.stats)
+    if _token_pool is not None:
+        PROFILE.extra['tokens'] = _token_pool.summary()
+    PROFILE.write(path)
+    print("\n" + "="*80)
+    print("PERFIL DA EXECUÇÃO")
+    PROFILE.print_summary()
+    print(f"Perfil completo gravado em {path}")
+
 
 def main():
-    if not os.path.exists("repo_metrics.csv"):
+    args = parse_args()
+    if args.cprofile:
+        run_with_cprofile(lambda: run(args), args.cprofile)
+    else:
+        run(args)
+    report_profile(args.profile_output)
+
+
+def run(args):
+    selection = build_field_selection(args.metrics)
+    metrics = selection.metrics
+    if args.history:
+        try:
+            get_repo_history(args.total, args.history_output, args.history_parallelism, args.history_requests,
+                             args.history_pages)
+        except Exception as e:
+            print(f"\nOcorreu um erro: {e}")
+
+    # Um único caminho para o dataset: o --output do fluxo ou o padrão (Parquet quando existir, senão o CSV)
+    metrics_path = args.output if args.stream else default_metrics_path()
+    incremental = args.incremental and os.path.exists(metrics_path)
+    collect = incremental or not os.path.exists(metrics_path)
+    # Métricas pedidas explicitamente (--metrics ou --backfill) que faltam no dataset salvo são buscadas
+    # só com os campos delas; na atualização incremental o dataset precisa estar completo
+    requested = ALL_METRICS if incremental else metrics if args.metrics or args.backfill else ()
+    missing = ()
+    if requested and os.path.exists(metrics_path):
+        missing = missing_metric_groups(requested, metrics_path)
+    collected = False
+    if collect or missing:
+      cache = ResponseCache(args.cache_path, args.cache_ttl) if args.cache_ttl > 0 else None
       try:
-        
-          repo_nodes = get_all_top_repos(1000)
-          print(f"Lista de {len(repo_nodes)} repositórios obtida com sucesso!\n")
+          if collect and incremental and metrics != ALL_METRICS:
+              raise Exception("A atualização incremental busca todas as métricas; não combine --incremental com --metrics.")
+          fetch = details_fetcher(args, cache, selection)
+          if missing:
+              backfill_metrics(missing, details_fetcher(args, cache, build_field_selection(missing)), cache, metrics_path)
+
+          if collect and args.stream:
+              if args.output == CSV_PATH and os.path.exists(PARQUET_PATH):
+                  # O fluxo grava só o CSV; o Parquet da execução anterior seria preferido pela análise
+                  os.remove(PARQUET_PATH)
+              print(f"Iniciando coleta em fluxo de {args.total} repositórios...")
+              if args.sharded:
+                  # Os nós da busca são pequenos; o que flui em páginas são os detalhes e as métricas
+                  repo_nodes = get_sharded_top_repos(args.total, args.single_pass, args.page_size, cache,
+                                                     args.shard_parallelism, selection)
+                  pages = (repo_nodes[start:start + 100] for start in range(0, len(repo_nodes), 100))
+              else:
+                  pages = iter_top_repo_pages(args.total, with_details=args.single_pass, page_size=args.page_size,
+                                              cache=cache, selection=selection)
+              if args.single_pass:
+                  repo_data = (repo for page in pages for repo in page)
+              else:
+                  repo_data = iter_repo_details(pages, args.batch_size, args.max_nodes, cache, selection)
+              if metrics == ALL_METRICS:
+                  total = write_metrics_stream(iter_repo_metrics(repo_data), args.output)
+              else:
+                  # Um único instante de referência para todos os blocos, como em iter_repo_metrics
+                  frame = functools.partial(build_metrics_frame, now=time.time(), metrics=metrics)
+                  total = write_metrics_stream(repo_data, args.output, frame=frame)
+              print(f"\n{total} repositórios gravados em {args.output}\n")
+              collected = True
+          elif collect:
+              if incremental:
+                  if args.sharded:
+                      list_repos = functools.partial(get_sharded_top_repos, page_size=args.page_size,
+                                                     parallelism=args.shard_parallelism)
+                  else:
+                      list_repos = get_all_top_repos
+                  repo_data = refresh_repo_data(args.total, fetch, metrics_path, list_repos)
+              elif args.sharded:
+                  repo_nodes = get_sharded_top_repos(args.total, args.single_pass, args.page_size, cache,
+                                                     args.shard_parallelism, selection)
+                  print(f"Lista de {len(repo_nodes)} repositórios obtida com sucesso!\n")
+                  if args.single_pass:
+                      repo_data = repo_nodes
+                  else:
+                      repo_data = get_repo_details_with_cache(repo_nodes, fetch, cache, selection) if cache else fetch(repo_nodes)
+              elif args.single_pass:
+                  print(f"Iniciando coleta de {args.total} repositórios com detalhes (em lotes de {args.page_size})...")
+                  pages = iter_top_repo_pages(args.total, with_details=True, page_size=args.page_size, cache=cache,
+                                              selection=selection)
+                  repo_data = (repo for page in pages for repo in page)
+              else:
+                  repo_nodes = get_all_top_repos(args.total, cache=cache)
+                  print(f"Lista de {len(repo_nodes)} repositórios obtida com sucesso!\n")
+
+                  repo_data = get_repo_details_with_cache(repo_nodes, fetch, cache, selection) if cache else fetch(repo_nodes)
+                  print("\nDetalhes dos repositórios obtidos com sucesso!\n")
 
-          repo_data = get_repo_details(GET_REPO_DETAILS_QUERY, repo_nodes)
-          print("\nDetalhes dos repositórios obtidos com sucesso!\n")
+              get_repo_metrics_result = get_repo_metrics(repo_data, metrics)
+              collected = True
+              print("\nDataFrame com métricas dos repositórios criado com sucesso!\n")
+              print(get_repo_metrics_result.head())
 
-          get_repo_metrics_result = get_repo_metrics(repo_data)
-          print("\nDataFrame com métricas dos repositórios criado com sucesso!\n")
-          print(get_repo_metrics_result.head())
+          if _client is not None:
+              _client.print_stats()
+          if _token_pool is not None and len(_token_pool) > 1:
+              print("\nUso dos tokens:")
+              for token, usage in _token_pool.summary().items():
+                  print(f"  {token}: {usage['requests']} requisições, saldo {usage['remaining']}")
 
       except Exception as e:
           print(f"\nOcorreu um erro: {e}")
-    
+      finally:
+          if cache:
+              PROFILE.extra['cache'] = {'hits': cache.hits, 'misses': cache.misses}
+              cache.close()
 
-    if os.path.exists("repo_metrics.csv"):
-        df_metrics = get_df_metrics()
-        print("\nMétricas dos repositórios obtidas com sucesso a partir do CSV!\n")
+    if not args.stream:
+        # A coleta grava o Parquet ao lado do CSV; a partir daqui ele é o dataset preferido
+        metrics_path = default_metrics_path()
+    if args.snapshot and not collected:
+        # O dataset salvo é de uma coleta anterior; gravá-lo com a data de hoje falsearia o histórico
+        print("\nSnapshot não gravado: esta execução não coletou um dataset novo.")
+    elif args.snapshot:
+        snapshot_df = read_metrics(metrics_path)
+        if missing_metrics(snapshot_df.columns):
+            print("\nSnapshot não gravado: o dataset não tem todas as métricas (coletado com --metrics).")
+        else:
+            snapshot_date = append_snapshot(snapshot_df, root=args.snapshot_dir)
+            print(f"\nSnapshot de {snapshot_date} gravado em {args.snapshot_dir}/")
+
+    incomplete = os.path.exists(metrics_path) and missing_metric_groups(path=metrics_path)
+    if incomplete:
+        partial_metrics_analysis(incomplete, metrics_path)
+    elif os.path.exists(metrics_path):
+        stats = load_research_stats(metrics_path)
+        df_metrics = get_df_metrics(stats)
+        print(f"\nMétricas dos repositórios obtidas com sucesso a partir de {metrics_path}!\n")
         for key, value in df_metrics.items():
             print(f"{key}: {value}")
-        
-        metrics_analysis()
-        per_language_analysis()
+
+        metrics_analysis(stats)
+        per_language_analysis(stats)
+        if args.recortes:
+            from parallel_analysis import print_parallel_analysis, run_parallel_analysis
+            slices, mainstream = run_parallel_analysis(metrics_path, workers=args.workers)
+            print_parallel_analysis(slices, mainstream)
         
         print("\n" + "="*80)
         print("ANÁLISE COMPLETA FINALIZADA!")
         print("Arquivos gerados:")
-        print("- repo_metrics.csv: Dados detalhados de cada repositório")
+        print(f"- {metrics_path}: Dados detalhados de cada repositório")
+        if not args.stream and metrics_path == PARQUET_PATH and os.path.exists(CSV_PATH):
+            print(f"- {CSV_PATH}: Mesmos dados exportados em CSV")
+        if args.history and os.path.exists(args.history_output):
+            print(f"- {args.history_output}: Cadências de releases, PRs e issues de cada repositório")
      
         print("="*80)
     else:
-        print("Arquivo repo_metrics.csv não encontrado. Execute o script novamente para gerar os dados.")
+        print(f"Arquivo {metrics_path} não encontrado. Execute o script novamente para gerar os dados.")
 
 if __name__ == '__main__':
     main()
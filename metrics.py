@@ -0,0 +1,210 @@
+"""Derivação das métricas de cada repositório e gravação do dataset em blocos"""
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from storage import METRICS_SCHEMA, to_arrow, write_metrics
+
+SECONDS_PER_DAY = 60 * 60 * 24
+
+METRIC_DTYPES = {
+    'nameWithOwner': 'object',
+    'idade_repositorio_dias': 'float64',
+    'pull_requests_aceitas': 'int64',
+    'releases': 'int64',
+    'tempo_ate_ultima_atualizacao_dias': 'float64',
+    'linguagem_primaria': 'object',
+    'issues_fechadas': 'int64',
+    'total_issues': 'int64',
+    'taxa_resolucao_issues_pct': 'float64',
+    'atividade_recente': 'object',
+    'maturidade': 'object',
+    'created_at': 'object',
+    'pushed_at': 'object',
+}
+
+# Colunas derivadas de cada grupo de métricas (os campos da API de cada grupo estão em queries.METRIC_FIELDS)
+METRIC_COLUMNS = {
+    'age': ['idade_repositorio_dias', 'maturidade'],
+    'update': ['tempo_ate_ultima_atualizacao_dias', 'atividade_recente'],
+    'language': ['linguagem_primaria'],
+    'releases': ['releases'],
+    'prs': ['pull_requests_aceitas'],
+    'issues': ['issues_fechadas', 'total_issues', 'taxa_resolucao_issues_pct'],
+}
+# Datas brutas gravadas junto com a idade e a atualização; só a atualização incremental depende delas,
+# e datasets antigos não as têm
+RAW_COLUMNS = {
+    'age': ['created_at'],
+    'update': ['pushed_at'],
+}
+
+
+def metric_columns(metrics=None):
+    """Colunas do dataset produzidas pelas métricas pedidas (todas, se None), na ordem fixa do dataset"""
+    wanted = {column for metric in (metrics or METRIC_COLUMNS)
+              for column in METRIC_COLUMNS[metric] + RAW_COLUMNS.get(metric, [])}
+    return [column for column in METRIC_DTYPES if column == 'nameWithOwner' or column in wanted]
+
+
+def missing_metrics(columns, metrics=None):
+    """Grupos de `metrics` (todos, se None) com alguma coluna derivada ausente de `columns`"""
+    columns = set(columns)
+    return tuple(metric for metric in (metrics or METRIC_COLUMNS) if not columns.issuperset(METRIC_COLUMNS[metric]))
+
+
+def repo_metrics_row(repo, now):
+    """Calcula as métricas de um repositório em relação ao instante de referência `now` (epoch)"""
+    created_at = datetime.fromisoformat(repo['createdAt'].replace('Z', '+00:00')).timestamp()
+    pushed_at = datetime.fromisoformat(repo['pushedAt'].replace('Z', '+00:00')).timestamp()
+
+    idade_repositorio = (now - created_at) / SECONDS_PER_DAY
+    tempo_ate_ultima_atualizacao = (now - pushed_at) / SECONDS_PER_DAY
+    pull_requests_aceitas = repo['pullRequests']['totalCount']
+    releases = repo['releases']['totalCount']
+    issues_fechadas = repo['closedIssues']['totalCount']
+    total_issues = repo['totalIssues']['totalCount']
+    taxa_resolucao_issues = (issues_fechadas / total_issues * 100) if total_issues > 0 else 0
+
+    return {
+        'nameWithOwner': repo['nameWithOwner'],
+        'idade_repositorio_dias': round(idade_repositorio, 2),
+        'pull_requests_aceitas': pull_requests_aceitas,
+        'releases': releases,
+        'tempo_ate_ultima_atualizacao_dias': round(tempo_ate_ultima_atualizacao, 2),
+        'linguagem_primaria': repo['primaryLanguage']['name'] if repo['primaryLanguage'] else 'N/A',
+        'issues_fechadas': issues_fechadas,
+        'total_issues': total_issues,
+        'taxa_resolucao_issues_pct': round(taxa_resolucao_issues, 2),
+        'atividade_recente': 'Ativo' if tempo_ate_ultima_atualizacao <= 30 else 'Inativo',
+        'maturidade': 'Maduro' if idade_repositorio > 365 else 'Jovem',
+        'created_at': repo['createdAt'],
+        'pushed_at': repo['pushedAt'],
+    }
+
+
+def iter_repo_metrics(repo_data, now=None):
+    """Gera as linhas de métricas uma a uma, todas medidas contra o mesmo instante de referência"""
+    now = time.time() if now is None else now
+    for repo in repo_data:
+        if not repo: continue # Pula repositórios que podem ter falhado na coleta
+        yield repo_metrics_row(repo, now)
+
+
+def metrics_frame(rows, columns=None):
+    """Monta um DataFrame com as colunas e tipos fixos do dataset (ou só com `columns`)"""
+    columns = columns or list(METRIC_DTYPES)
+    return pd.DataFrame(rows, columns=columns).astype({column: METRIC_DTYPES[column] for column in columns})
+
+
+def normalize_repo_data(repo_data, metrics=None):
+    """Achata as respostas da API em colunas (mesmo resultado de pd.json_normalize para estes campos,
+    sem o custo da recursão genérica por registro); só os campos das métricas pedidas são lidos"""
+    metrics = metrics or METRIC_COLUMNS
+    repos = [repo for repo in repo_data if repo]
+    raw = {'nameWithOwner': [repo['nameWithOwner'] for repo in repos]}
+    if 'age' in metrics:
+        raw['createdAt'] = [repo['createdAt'] for repo in repos]
+    if 'update' in metrics:
+        raw['pushedAt'] = [repo['pushedAt'] for repo in repos]
+    if 'language' in metrics:
+        raw['primaryLanguage.name'] = [(repo['primaryLanguage'] or {}).get('name') for repo in repos]
+    if 'releases' in metrics:
+        raw['releases.totalCount'] = [repo['releases']['totalCount'] for repo in repos]
+    if 'prs' in metrics:
+        raw['pullRequests.totalCount'] = [repo['pullRequests']['totalCount'] for repo in repos]
+    if 'issues' in metrics:
+        raw['totalIssues.totalCount'] = [repo['totalIssues']['totalCount'] for repo in repos]
+        raw['closedIssues.totalCount'] = [repo['closedIssues']['totalCount'] for repo in repos]
+    return pd.DataFrame(raw)
+
+
+def github_timestamps(column):
+    """Converte uma coluna de datas da API (sempre UTC, 'YYYY-MM-DDTHH:MM:SSZ') em segundos desde a epoch.
+
+    O parse direto para datetime64 do numpy é bem mais rápido que pd.to_datetime com inferência de formato.
+    """
+    return pd.Series(column.str.removesuffix('Z').to_numpy(dtype='datetime64[s]').astype('int64'), index=column.index)
+
+
+def build_metrics_frame(repo_data, now=None, metrics=None):
+    """Versão colunar de iter_repo_metrics: normaliza as respostas em colunas e calcula tudo vetorizado.
+
+    Com `metrics`, só as colunas desses grupos são calculadas (as respostas só precisam ter os campos deles).
+    """
+    now = time.time() if now is None else now
+    columns = metric_columns(metrics)
+    raw = normalize_repo_data(repo_data, metrics)
+    if raw.empty:
+        return metrics_frame([], columns)
+
+    df = {'nameWithOwner': raw['nameWithOwner']}
+    if 'createdAt' in raw:
+        idade_repositorio = (now - github_timestamps(raw['createdAt'])) / SECONDS_PER_DAY
+        df['idade_repositorio_dias'] = idade_repositorio.round(2)
+        df['maturidade'] = pd.Categorical(np.where(idade_repositorio > 365, 'Maduro', 'Jovem'),
+                                          categories=['Maduro', 'Jovem'])
+        df['created_at'] = raw['createdAt']
+    if 'pushedAt' in raw:
+        tempo_ate_ultima_atualizacao = (now - github_timestamps(raw['pushedAt'])) / SECONDS_PER_DAY
+        df['tempo_ate_ultima_atualizacao_dias'] = tempo_ate_ultima_atualizacao.round(2)
+        df['atividade_recente'] = pd.Categorical(np.where(tempo_ate_ultima_atualizacao <= 30, 'Ativo', 'Inativo'),
+                                                 categories=['Ativo', 'Inativo'])
+        df['pushed_at'] = raw['pushedAt']
+    if 'primaryLanguage.name' in raw:
+        df['linguagem_primaria'] = raw['primaryLanguage.name'].fillna('N/A').astype('category')
+    if 'releases.totalCount' in raw:
+        df['releases'] = raw['releases.totalCount'].astype('int64')
+    if 'pullRequests.totalCount' in raw:
+        df['pull_requests_aceitas'] = raw['pullRequests.totalCount'].astype('int64')
+    if 'closedIssues.totalCount' in raw:
+        issues_fechadas = raw['closedIssues.totalCount'].astype('int64')
+        total_issues = raw['totalIssues.totalCount'].astype('int64')
+        taxa_resolucao_issues = np.where(total_issues > 0, issues_fechadas / total_issues.replace(0, 1) * 100, 0.0)
+        df['issues_fechadas'] = issues_fechadas
+        df['total_issues'] = total_issues
+        df['taxa_resolucao_issues_pct'] = np.round(taxa_resolucao_issues, 2)
+
+    return pd.DataFrame(df)[columns]
+
+
+def iter_chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_metrics_stream(rows, path="repo_metrics.csv", chunk_size=1000, frame=metrics_frame, schema=METRICS_SCHEMA):
+    """Grava as linhas em blocos de `chunk_size` à medida que chegam; a memória fica limitada a um bloco.
+
+    O formato é escolhido pela extensão: .parquet grava com o esquema fixo de storage, qualquer outra em CSV.
+    `frame` e `schema` permitem reaproveitar a gravação para outros datasets (ex.: o histórico).
+    """
+    total = 0
+    writer = None
+    try:
+        for i, chunk in enumerate(iter_chunks(rows, chunk_size)):
+            df = frame(chunk)
+            if path.endswith('.parquet'):
+                table = to_arrow(df, schema)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+                writer.write_table(table)
+            else:
+                df.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            total += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if total == 0:
+        write_metrics(frame([]), path, schema)
+    return total
@@ -0,0 +1,198 @@
+"""Estatísticas pesadas por linguagem × maturidade × atividade, calculadas em paralelo em vários processos.
+
+O dataset é reordenado pelas chaves dos recortes e gravado em Feather sem compressão; cada processo
+abre o arquivo com memory map e lê seu recorte como uma fatia contígua, sem cópia entre processos.
+"""
+import argparse
+import os
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from scipy import stats as scipy_stats
+
+from analysis import LINGUAGENS_MAINSTREAM, load_metrics
+from profiling import profiled
+
+SLICE_KEYS = ['linguagem_primaria', 'maturidade', 'atividade_recente']
+STRATUM_KEYS = ['maturidade', 'atividade_recente']
+BOOTSTRAP_METRICS = {
+    'prs': 'pull_requests_aceitas',
+    'releases': 'releases',
+    'atualizacao': 'tempo_ate_ultima_atualizacao_dias',
+}
+# Estrelas não fazem parte do dataset, mas ele está em ordem decrescente de estrelas: como a correlação de
+# Spearman só depende dos postos, -posicao dá o mesmo resultado que as estrelas (a menos de empates)
+CORRELATION_COLUMNS = {'estrelas': 'posicao', 'prs': 'pull_requests_aceitas', 'releases': 'releases'}
+MAX_BOOTSTRAP_CELLS = 5_000_000
+
+_table = None
+
+
+def _open_table(path):
+    """Abre o Feather mapeado em memória uma vez por processo"""
+    global _table
+    _table = feather.read_table(path, memory_map=True)
+
+
+def _columns(start, stop, columns):
+    part = _table.slice(start, stop - start)
+    return {column: part.column(column).to_numpy() for column in columns}
+
+
+def bootstrap_median_ci(values, rng, n_boot=1000, confidence=0.95):
+    """Intervalo de confiança da mediana por bootstrap percentil, em blocos para limitar a memória"""
+    n = len(values)
+    if n < 2:
+        return np.nan, np.nan
+    medians = np.empty(n_boot)
+    step = max(1, MAX_BOOTSTRAP_CELLS // n)
+    for start in range(0, n_boot, step):
+        size = min(step, n_boot - start)
+        medians[start:start + size] = np.median(values[rng.integers(0, n, (size, n))], axis=1)
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(medians, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def spearman(x, y):
+    if len(x) < 3 or np.all(x == x[0]) or np.all(y == y[0]):
+        return np.nan
+    return float(scipy_stats.spearmanr(x, y).statistic)
+
+
+def analyze_slice(key, start, stop, n_boot, seed):
+    """Medianas com IC por bootstrap e correlações de Spearman de um recorte"""
+    values = _columns(start, stop, set(BOOTSTRAP_METRICS.values()) | set(CORRELATION_COLUMNS.values()))
+    rng = np.random.default_rng([seed, zlib.crc32(repr(key).encode('utf-8'))])
+    row = dict(zip(SLICE_KEYS, key), repositorios=stop - start)
+    for name, column in BOOTSTRAP_METRICS.items():
+        column_values = values[column].astype('float64')
+        row[f'{name}_mediana'] = float(np.median(column_values))
+        row[f'{name}_ic_inf'], row[f'{name}_ic_sup'] = bootstrap_median_ci(column_values, rng, n_boot)
+
+    estrelas = -values['posicao']
+    row['rho_estrelas_prs'] = spearman(estrelas, values['pull_requests_aceitas'])
+    row['rho_estrelas_releases'] = spearman(estrelas, values['releases'])
+    row['rho_prs_releases'] = spearman(values['pull_requests_aceitas'], values['releases'])
+    return row
+
+
+def compare_mainstream(stratum, start, stop):
+    """Mann–Whitney (bilateral) entre linguagens mainstream e as demais, dentro de um estrato"""
+    values = _columns(start, stop, {'linguagem_primaria', *BOOTSTRAP_METRICS.values()})
+    mainstream = np.isin(values['linguagem_primaria'].astype(str), LINGUAGENS_MAINSTREAM)
+    rows = []
+    for name, column in BOOTSTRAP_METRICS.items():
+        grupo, outros = values[column][mainstream], values[column][~mainstream]
+        row = dict(zip(STRATUM_KEYS, stratum), metrica=name, n_mainstream=len(grupo), n_outros=len(outros),
+                   mediana_mainstream=float(np.median(grupo)) if len(grupo) else np.nan,
+                   mediana_outros=float(np.median(outros)) if len(outros) else np.nan, u=np.nan, p_valor=np.nan)
+        if len(grupo) and len(outros):
+            result = scipy_stats.mannwhitneyu(grupo, outros, alternative='two-sided')
+            row['u'], row['p_valor'] = float(result.statistic), float(result.pvalue)
+        rows.append(row)
+    return rows
+
+
+def _run_task(task):
+    kind, args = task
+    return kind, analyze_slice(*args) if kind == 'slice' else compare_mainstream(*args)
+
+
+def write_sliced_feather(df, path):
+    """Ordena o dataset pelas chaves dos recortes e grava o Feather; retorna as faixas de linhas de cada grupo"""
+    df = pd.DataFrame({
+        'linguagem_primaria': df['linguagem_primaria'].astype(object).fillna('N/A').astype(str),
+        'maturidade': df['maturidade'].astype(str),
+        'atividade_recente': df['atividade_recente'].astype(str),
+        'pull_requests_aceitas': df['pull_requests_aceitas'].to_numpy(),
+        'releases': df['releases'].to_numpy(),
+        # Mesmo cuidado de compute_research_stats: o float32 do armazenamento volta a float64 com 2 casas
+        'tempo_ate_ultima_atualizacao_dias': df['tempo_ate_ultima_atualizacao_dias'].astype('float64').round(2).to_numpy(),
+        'posicao': np.arange(len(df), dtype='int64'),
+    })
+    # Maturidade e atividade primeiro: cada estrato também fica contíguo, com as linguagens dentro dele
+    df = df.sort_values(STRATUM_KEYS + ['linguagem_primaria'], kind='stable', ignore_index=True)
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), path, compression='uncompressed')
+
+    def ranges(keys):
+        sizes = df.groupby(keys, sort=False).size()
+        stops = np.cumsum(sizes.to_numpy())
+        return [(key if isinstance(key, tuple) else (key,), int(stop - size), int(stop))
+                for key, size, stop in zip(sizes.index, sizes.to_numpy(), stops)]
+
+    return ranges(STRATUM_KEYS + ['linguagem_primaria']), ranges(STRATUM_KEYS), len(df)
+
+
+@profiled(count_rows=False)
+def run_parallel_analysis(path=None, workers=None, n_boot=1000, seed=42, min_size=5):
+    """Calcula as estatísticas de todos os recortes com `workers` processos (padrão: núcleos disponíveis).
+
+    Retorna (recortes, mainstream): um DataFrame por recorte linguagem × maturidade × atividade com
+    `min_size` repositórios ou mais, e os testes de Mann–Whitney por estrato e no dataset inteiro.
+    """
+    df = load_metrics(path, SLICE_KEYS + list(BOOTSTRAP_METRICS.values()))
+    with tempfile.TemporaryDirectory() as directory:
+        feather_path = os.path.join(directory, 'recortes.feather')
+        groups, strata, total = write_sliced_feather(df, feather_path)
+        del df
+
+        tasks = [('slice', ((language, maturity, activity), start, stop, n_boot, seed))
+                 for (maturity, activity, language), start, stop in groups if stop - start >= min_size]
+        tasks += [('mainstream', (stratum, start, stop)) for stratum, start, stop in strata]
+        tasks.append(('mainstream', (('Todos', 'Todos'), 0, total)))
+
+        # Recortes grandes primeiro, para que o último processo a terminar não fique com o mais pesado
+        tasks.sort(key=lambda task: task[1][1] - task[1][2])
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open_table, initargs=(feather_path,)) as executor:
+            results = list(executor.map(_run_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    slices = pd.DataFrame([result for kind, result in results if kind == 'slice'])
+    if not slices.empty:
+        slices = slices.sort_values('repositorios', ascending=False, kind='stable', ignore_index=True)
+    mainstream = pd.DataFrame([row for kind, rows in results if kind == 'mainstream' for row in rows])
+    return slices, mainstream
+
+
+def print_parallel_analysis(slices, mainstream, top=15):
+    print("\n" + "="*80)
+    print("ESTATÍSTICAS POR RECORTE (LINGUAGEM × MATURIDADE × ATIVIDADE)")
+    print("="*80)
+    for linha in slices.head(top).itertuples():
+        print(f"\n{linha.linguagem_primaria} / {linha.maturidade} / {linha.atividade_recente} ({linha.repositorios} repositórios)")
+        print(f" PRs - Mediana: {linha.prs_mediana:.0f} (IC 95%: {linha.prs_ic_inf:.0f}–{linha.prs_ic_sup:.0f})")
+        print(f" Releases - Mediana: {linha.releases_mediana:.0f} (IC 95%: {linha.releases_ic_inf:.0f}–{linha.releases_ic_sup:.0f})")
+        print(f" Spearman - estrelas×PRs: {linha.rho_estrelas_prs:.2f}, estrelas×releases: {linha.rho_estrelas_releases:.2f}, "
+              f"PRs×releases: {linha.rho_prs_releases:.2f}")
+
+    print("\nRQ05: mainstream vs. demais linguagens (Mann–Whitney, bilateral)")
+    geral = mainstream[(mainstream['maturidade'] == 'Todos') & (mainstream['atividade_recente'] == 'Todos')]
+    for linha in geral.itertuples():
+        print(f" {linha.metrica}: mediana {linha.mediana_mainstream:.2f} vs {linha.mediana_outros:.2f} "
+              f"(n={linha.n_mainstream}/{linha.n_outros}), U={linha.u:.0f}, p={linha.p_valor:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estatísticas por recorte calculadas em paralelo")
+    parser.add_argument("--input", help="Dataset de métricas (padrão: repo_metrics.parquet ou .csv)")
+    parser.add_argument("--workers", type=int, help="Processos (padrão: núcleos disponíveis)")
+    parser.add_argument("--bootstrap", type=int, default=1000, help="Reamostragens do bootstrap")
+    parser.add_argument("--min-size", type=int, default=5, help="Tamanho mínimo de um recorte")
+    parser.add_argument("--output", default="analise_recortes.csv", help="Arquivo com as estatísticas dos recortes")
+    args = parser.parse_args()
+
+    slices, mainstream = run_parallel_analysis(args.input, args.workers, args.bootstrap, min_size=args.min_size)
+    print_parallel_analysis(slices, mainstream)
+    slices.to_csv(args.output, index=False)
+    mainstream.to_csv(os.path.splitext(args.output)[0] + "_mainstream.csv", index=False)
+    print(f"\nEstatísticas gravadas em {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Instrumentação da execução: tempo por etapa, requisições, custo em pontos, bytes e linhas por segundo"""
+import cProfile
+import functools
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+PROFILE_PATH = "run_profile.json"
+
+
+class RunProfile:
+    """Acumula as medições de uma execução e as grava como um perfil em JSON.
+
+    Etapas aninhadas (ex.: run_graphql_repo_query dentro de get_all_top_repos) são medidas
+    separadamente, então o tempo de uma etapa inclui o das etapas internas.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.stages = defaultdict(lambda: {'calls': 0, 'wall': 0.0, 'rows': 0})
+        self.requests = defaultdict(lambda: {'requests': 0, 'retries': 0, 'failures': 0, 'cost': 0,
+                                             'latency': 0.0, 'bytes': 0})
+        self.extra = {}
+
+    def record_stage(self, name, wall, rows=None):
+        with self.lock:
+            stage = self.stages[name]
+            stage['calls'] += 1
+            stage['wall'] += wall
+            stage['rows'] += rows or 0
+
+    @contextmanager
+    def stage(self, name):
+        """Mede o bloco como uma etapa; o valor gerado é um dict onde o bloco pode informar 'rows'"""
+        info = {'rows': None}
+        started = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.record_stage(name, time.perf_counter() - started, info['rows'])
+
+    def add_request_stats(self, stats):
+        """Soma contadores de requisições por operação (formato de GitHubGraphQLClient.stats)"""
+        with self.lock:
+            for operation, values in stats.items():
+                totals = self.requests[operation]
+                for key in totals:
+                    totals[key] += values.get(key, 0)
+
+    def to_dict(self):
+        with self.lock:
+            stages = {}
+            for name, stage in self.stages.items():
+                rows_per_sec = stage['rows'] / stage['wall'] if stage['rows'] and stage['wall'] else None
+                stages[name] = dict(stage, rows_per_sec=rows_per_sec)
+            requests = {operation: dict(values) for operation, values in self.requests.items()}
+            totals = {key: sum(values[key] for values in requests.values())
+                      for key in ('requests', 'retries', 'failures', 'cost', 'bytes')}
+            return {
+                'wall': time.perf_counter() - self.started,
+                'stages': stages,
+                'requests': requests,
+                'request_totals': totals,
+                **self.extra,
+            }
+
+    def write(self, path=PROFILE_PATH):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    def print_summary(self):
+        """Imprime a tabela de etapas e os totais de requisições"""
+        profile = self.to_dict()
+        print(f"\n{'Etapa':<28}{'Chamadas':>9}{'Tempo (s)':>11}{'Linhas':>9}{'Linhas/s':>11}")
+        for name, stage in sorted(profile['stages'].items(), key=lambda item: -item[1]['wall']):
+            rows_per_sec = f"{stage['rows_per_sec']:.0f}" if stage['rows_per_sec'] else '-'
+            print(f"{name:<28}{stage['calls']:>9}{stage['wall']:>11.3f}{stage['rows'] or '-':>9}{rows_per_sec:>11}")
+        totals = profile['request_totals']
+        print(f"\nTempo total: {profile['wall']:.2f}s | {totals['requests']} requisições, {totals['retries']} repetidas, "
+              f"{totals['failures']} falhas, {totals['cost']} pontos, {totals['bytes'] / 1024:.1f} KB")
+
+
+PROFILE = RunProfile()
+
+
+def profiled(name=None, count_rows=True):
+    """Decorator que registra a função como uma etapa; com count_rows, o len() do resultado conta como linhas"""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with PROFILE.stage(stage_name) as info:
+                result = func(*args, **kwargs)
+                if count_rows and hasattr(result, '__len__'):
+                    info['rows'] = len(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def run_with_cprofile(func, path):
+    """Executa `func` sob o cProfile e grava as estatísticas em `path` (abrir com pstats ou snakeviz)"""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func)
+    finally:
+        profiler.dump_stats(path)
+        print(f"Perfil do cProfile gravado em {path}")
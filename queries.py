@@ -0,0 +1,215 @@
+"""Queries GraphQL usadas na coleta dos repositórios"""
+from dataclasses import dataclass
+
+GET_TOP_REPOS_PAGINATED_QUERY = """
+query GetTopRepos($afterCursor: String, $searchQuery: String = "is:public sort:stars-desc") {
+  search(query: $searchQuery, type: REPOSITORY, first: 100, after: $afterCursor) {
+    nodes {
+      ... on Repository {
+        owner {
+          login
+        }
+        name
+        nameWithOwner
+        pushedAt
+        stargazerCount
+      }
+    }
+    pageInfo {
+      endCursor
+      hasNextPage
+    }
+  }
+}
+"""
+
+REPO_DETAILS_FRAGMENT = """
+fragment RepoDetails on Repository {
+  nameWithOwner
+  createdAt
+  pushedAt
+  primaryLanguage {
+    name
+  }
+  releases {
+    totalCount
+  }
+  pullRequests(states: MERGED) {
+    totalCount
+  }
+  totalIssues: issues {
+    totalCount
+  }
+  closedIssues: issues(states: CLOSED) {
+    totalCount
+  }
+}
+"""
+
+# As queries de detalhes recebem o fragmento RepoDetails da FieldSelection em uso (ver build_field_selection)
+REPO_DETAILS_QUERY_BODY = """
+query GetRepoDetails($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+    ...RepoDetails
+  }
+}
+"""
+
+# Coleta em uma única passada: a própria busca já traz os detalhes de cada repositório
+TOP_REPOS_WITH_DETAILS_QUERY_BODY = """
+query GetTopReposWithDetails($afterCursor: String, $pageSize: Int!, $searchQuery: String = "is:public sort:stars-desc") {
+  search(query: $searchQuery, type: REPOSITORY, first: $pageSize, after: $afterCursor) {
+    nodes {
+      ... on Repository {
+        owner {
+          login
+        }
+        name
+        stargazerCount
+        ...RepoDetails
+      }
+    }
+    pageInfo {
+      endCursor
+      hasNextPage
+    }
+  }
+}
+"""
+
+# Total de resultados de uma busca e as estrelas do primeiro colocado, usados no planejamento dos shards
+COUNT_REPOS_QUERY = """
+query CountRepos($searchQuery: String!) {
+  search(query: $searchQuery, type: REPOSITORY, first: 1) {
+    repositoryCount
+    nodes {
+      ... on Repository {
+        stargazerCount
+      }
+    }
+  }
+}
+"""
+
+# Histórico de um repositório (modo --history): cada query pagina uma conexão, sempre com o alias `history`,
+# das mais recentes para as mais antigas
+GET_REPO_RELEASES_QUERY = """
+query GetRepoReleases($owner: String!, $name: String!, $afterCursor: String) {
+  repository(owner: $owner, name: $name) {
+    history: releases(first: 100, after: $afterCursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes {
+        createdAt
+      }
+      pageInfo {
+        endCursor
+        hasNextPage
+      }
+    }
+  }
+}
+"""
+
+GET_REPO_MERGED_PRS_QUERY = """
+query GetRepoMergedPullRequests($owner: String!, $name: String!, $afterCursor: String) {
+  repository(owner: $owner, name: $name) {
+    history: pullRequests(states: MERGED, first: 100, after: $afterCursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes {
+        mergedAt
+      }
+      pageInfo {
+        endCursor
+        hasNextPage
+      }
+    }
+  }
+}
+"""
+
+GET_REPO_CLOSED_ISSUES_QUERY = """
+query GetRepoClosedIssues($owner: String!, $name: String!, $afterCursor: String) {
+  repository(owner: $owner, name: $name) {
+    history: issues(states: CLOSED, first: 100, after: $afterCursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes {
+        createdAt
+        closedAt
+      }
+      pageInfo {
+        endCursor
+        hasNextPage
+      }
+    }
+  }
+}
+"""
+
+# Campo de rateLimit usado para controlar o ritmo das requisições
+RATE_LIMIT_FIELDS = """
+  rateLimit {
+    cost
+    remaining
+    resetAt
+  }
+"""
+
+# Custo estimado em nós de cada repositório no fragmento RepoDetails
+# (o próprio repositório + linguagem + 4 conexões com totalCount)
+REPO_DETAILS_NODE_COST = 6
+MAX_NODES_PER_BATCH = 600
+
+# Campos do RepoDetails de que cada grupo de métricas precisa, com o custo em nós de cada um
+# (nameWithOwner e o próprio repositório sempre vão e custam 1)
+METRIC_FIELDS = {
+    'age': ("createdAt", 0),
+    'update': ("pushedAt", 0),
+    'language': ("primaryLanguage {\n    name\n  }", 1),
+    'releases': ("releases {\n    totalCount\n  }", 1),
+    'prs': ("pullRequests(states: MERGED) {\n    totalCount\n  }", 1),
+    'issues': ("totalIssues: issues {\n    totalCount\n  }\n  closedIssues: issues(states: CLOSED) {\n    totalCount\n  }", 2),
+}
+ALL_METRICS = tuple(METRIC_FIELDS)
+
+
+@dataclass(frozen=True)
+class FieldSelection:
+    """Fragmento RepoDetails só com os campos das métricas pedidas e o seu custo em nós por repositório"""
+    metrics: tuple
+    fragment: str
+    node_cost: int
+
+
+def build_field_selection(metrics=None):
+    """Monta o fragmento para `metrics` (todas, se None); o conjunto completo usa o REPO_DETAILS_FRAGMENT original"""
+    unknown = set(metrics or ()) - set(METRIC_FIELDS)
+    if unknown:
+        raise Exception(f"Métricas desconhecidas: {', '.join(sorted(unknown))}. Opções: {', '.join(ALL_METRICS)}")
+    metrics = tuple(metric for metric in ALL_METRICS if metrics is None or metric in metrics)
+    if metrics == ALL_METRICS:
+        return FieldSelection(ALL_METRICS, REPO_DETAILS_FRAGMENT, REPO_DETAILS_NODE_COST)
+
+    fields = "\n  ".join(["nameWithOwner"] + [METRIC_FIELDS[metric][0] for metric in metrics])
+    fragment = f"\nfragment RepoDetails on Repository {{\n  {fields}\n}}\n"
+    return FieldSelection(metrics, fragment, 1 + sum(METRIC_FIELDS[metric][1] for metric in metrics))
+
+
+FULL_SELECTION = build_field_selection()
+
+
+def estimated_cost(repos, node_cost=REPO_DETAILS_NODE_COST):
+    """Pontos estimados de uma query com `repos` repositórios: um ponto a cada 100 nós, no mínimo 1"""
+    return max(1, -(-repos * node_cost // 100))
+
+
+def build_batched_details_query(batch, fragment=REPO_DETAILS_FRAGMENT):
+    """Monta uma única query GraphQL com um alias (r0, r1, ...) para cada repositório do lote"""
+    params = []
+    aliases = []
+    variables = {}
+    for i, repo_node in enumerate(batch):
+        params.append(f"$o{i}: String!, $n{i}: String!")
+        aliases.append(f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{\n    ...RepoDetails\n  }}")
+        variables[f"o{i}"] = repo_node['owner']['login']
+        variables[f"n{i}"] = repo_node['name']
+
+    query = (f"query GetRepoDetailsBatch({', '.join(params)}) {{\n" + "\n".join(aliases)
+             + RATE_LIMIT_FIELDS + "}\n" + fragment)
+    return query, variables
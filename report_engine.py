@@ -0,0 +1,60 @@
+"""Renderização dos relatórios a partir de templates Jinja2, pulando o trabalho quando o dataset não mudou"""
+import hashlib
+import os
+from datetime import datetime
+
+import pandas as pd
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+HASH_SUFFIX = '.hash'
+
+
+def dataset_hash(df):
+    """Hash do conteúdo do dataset, independente do arquivo (CSV, Parquet) de onde ele veio"""
+    digest = hashlib.sha256(",".join(df.columns).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ReportEngine:
+    """Renderiza ResearchStats em Markdown ou HTML com os templates de `template_dir`.
+
+    Ao lado de cada arquivo gerado fica um `<arquivo>.hash` com o hash do dataset e do template;
+    se nenhum dos dois mudou, a renderização é pulada (e a data da análise continua a da última geração).
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        self.env = Environment(loader=FileSystemLoader(template_dir), autoescape=select_autoescape(['html']),
+                               trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True)
+        # {{ valor|num('.2f') }} equivale a f"{valor:.2f}"
+        self.env.filters['num'] = format
+
+    def template_hash(self, template_name):
+        source, _, _ = self.env.loader.get_source(self.env, template_name)
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+    def render(self, template_name, stats, **context):
+        template = self.env.get_template(template_name)
+        return template.render(stats=stats, total=stats.total, data_analise=datetime.now().strftime("%d/%m/%Y"),
+                               **context)
+
+    def render_if_changed(self, template_name, path, df, build_stats, **context):
+        """Renderiza em `path` só se o dataset `df` ou o template mudaram; retorna True se gerou o arquivo.
+
+        `build_stats()` só é chamado quando é preciso renderizar, para que recortes sem mudança
+        não paguem nem o cálculo das estatísticas.
+        """
+        key = f"{dataset_hash(df)}:{self.template_hash(template_name)}"
+        hash_path = path + HASH_SUFFIX
+        if os.path.exists(path) and os.path.exists(hash_path):
+            with open(hash_path, encoding='utf-8') as f:
+                if f.read() == key:
+                    return False
+
+        content = self.render(template_name, build_stats(), **context)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        with open(hash_path, 'w', encoding='utf-8') as f:
+            f.write(key)
+        return True
@@ -0,0 +1,118 @@
+"""Planejamento e coleta paralela de buscas divididas em faixas de estrelas, para passar do limite de 1000 resultados"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from cache import repo_key
+from queries import COUNT_REPOS_QUERY
+
+SEARCH_CAP = 1000
+BASE_QUERY = "is:public sort:stars-desc"
+FIRST_YEAR = 2008
+
+
+def star_query(low, high=None, created=None):
+    """Monta a busca de uma faixa de estrelas (e, opcionalmente, de uma janela de criação)"""
+    stars = f"stars:>={low}" if high is None else f"stars:{low}..{high}"
+    created = f" created:{created}" if created else ""
+    return f"is:public {stars}{created} sort:stars-desc"
+
+
+class ShardPlanner:
+    """Divide a busca em faixas disjuntas de estrelas, de cima para baixo, cada uma com até `cap` resultados.
+
+    O tamanho de cada faixa é ajustado por busca binária no limite inferior, usando apenas
+    o repositoryCount da API. Quando um único valor de estrelas passa do limite, a faixa é
+    subdividida em janelas anuais de created:.
+    """
+
+    def __init__(self, run_query, cap=SEARCH_CAP):
+        self.run_query = run_query
+        self.cap = cap
+        self.counts = {}
+
+    def count(self, search_query):
+        if search_query not in self.counts:
+            result = self.run_query(COUNT_REPOS_QUERY, {"searchQuery": search_query})
+            if 'errors' in result:
+                raise Exception(f"Erro na API do GitHub: {result['errors']}")
+            search_data = result['data']['search']
+            nodes = search_data['nodes']
+            self.counts[search_query] = (search_data['repositoryCount'], nodes[0]['stargazerCount'] if nodes else 0)
+        return self.counts[search_query]
+
+    def lowest_bound(self, high):
+        """Menor limite inferior `low` tal que a faixa low..high ainda cabe no limite da busca"""
+        low, upper, best = 1, high, None
+        while low <= upper:
+            middle = (low + upper) // 2
+            if self.count(star_query(middle, high))[0] <= self.cap:
+                best = middle
+                upper = middle - 1
+            else:
+                low = middle + 1
+        return best
+
+    def split_by_created(self, stars):
+        """Subdivide um único valor de estrelas em janelas anuais de criação"""
+        shards = []
+        for year in range(FIRST_YEAR, datetime.now().year + 1):
+            search_query = star_query(stars, stars, f"{year}-01-01..{year}-12-31")
+            count = self.count(search_query)[0]
+            if count > self.cap:
+                print(f"\nAVISO: {search_query} tem {count} resultados; apenas os {self.cap} primeiros serão coletados.")
+            if count:
+                shards.append({'query': search_query, 'count': min(count, self.cap)})
+        return shards
+
+    def plan(self, total_to_fetch):
+        """Retorna os shards (busca e quantidade esperada) necessários para cobrir o top `total_to_fetch`"""
+        _, top_stars = self.count(BASE_QUERY)
+        shards = []
+        covered = 0
+        high = top_stars
+
+        while covered < total_to_fetch and high >= 1:
+            low = self.lowest_bound(high)
+            if low is None:
+                new_shards = self.split_by_created(high)
+                low = high
+            else:
+                count = self.count(star_query(low, high))[0]
+                # A faixa do topo fica aberta para incluir repositórios que ganharam estrelas durante a coleta
+                search_query = star_query(low) if high == top_stars else star_query(low, high)
+                new_shards = [{'query': search_query, 'count': count}]
+            shards.extend(new_shards)
+            covered += sum(shard['count'] for shard in new_shards)
+            high = low - 1
+
+        print(f"{len(shards)} shards planejados cobrindo {covered} repositórios "
+              f"({len(self.counts)} consultas de contagem).")
+        return shards
+
+
+def crawl_shards(shards, fetch_shard, total_to_fetch, parallelism=4):
+    """Coleta os shards em paralelo e junta os resultados em um top-N sem duplicatas, ordenado por estrelas.
+
+    `fetch_shard(search_query, limit)` deve retornar a lista de nós do shard. Os shards vêm em ordem
+    decrescente de estrelas, então o último necessário só busca os repositórios que ainda faltam.
+    """
+    work = []
+    remaining = total_to_fetch
+    for shard in shards:
+        if remaining <= 0:
+            break
+        work.append((shard['query'], min(shard['count'], remaining)))
+        remaining -= work[-1][1]
+
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        results = list(executor.map(lambda item: fetch_shard(*item), work))
+
+    # Um repositório pode mudar de faixa entre uma página e outra; fica a ocorrência com mais estrelas
+    merged = {}
+    for repo_node in (repo_node for nodes in results for repo_node in nodes):
+        key = repo_key(repo_node)
+        if key not in merged or repo_node['stargazerCount'] > merged[key]['stargazerCount']:
+            merged[key] = repo_node
+
+    ranked = sorted(merged.values(), key=lambda repo_node: repo_node['stargazerCount'], reverse=True)
+    return ranked[:total_to_fetch]
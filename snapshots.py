@@ -0,0 +1,131 @@
+"""Histórico de execuções: cada coleta vira um snapshot em Parquet particionado por data (snapshot_date=AAAA-MM-DD)"""
+import argparse
+import os
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from storage import to_arrow
+
+SNAPSHOT_DIR = "snapshots"
+PARTITION_FIELD = 'snapshot_date'
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_FIELD, pa.date32())]), flavor='hive')
+
+
+def append_snapshot(df, snapshot_date=None, root=SNAPSHOT_DIR):
+    """Grava o dataset como o snapshot de `snapshot_date` (hoje, por padrão) e retorna a data usada.
+
+    `rank` é a posição do repositório no dataset (a coleta já vem ordenada por estrelas). Os snapshots
+    anteriores nunca são alterados; só uma nova execução no mesmo dia substitui a partição daquele dia.
+    As linhas ficam ordenadas por nameWithOwner para que filtros por repositório pulem row groups.
+    """
+    snapshot_date = snapshot_date or date.today()
+    table = to_arrow(df)
+    table = table.append_column('rank', pa.array(range(1, len(table) + 1), pa.int32()))
+    table = table.append_column(PARTITION_FIELD, pa.array([snapshot_date] * len(table), pa.date32()))
+    table = table.sort_by('nameWithOwner')
+    ds.write_dataset(table, root, format='parquet', partitioning=PARTITIONING,
+                     existing_data_behavior='delete_matching', basename_template='part-{i}.parquet',
+                     file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'))
+    return snapshot_date
+
+
+class SnapshotStore:
+    """Consultas sobre os snapshots que leem só as partições e colunas necessárias"""
+
+    def __init__(self, root=SNAPSHOT_DIR):
+        if not os.path.isdir(root):
+            raise Exception(f"Nenhum snapshot encontrado em {root}. Rode a coleta com --snapshot.")
+        self.root = root
+        self.dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+
+    def dates(self):
+        """Datas disponíveis, lidas dos nomes das partições sem abrir nenhum arquivo"""
+        prefix = f"{PARTITION_FIELD}="
+        return sorted(date.fromisoformat(entry[len(prefix):]) for entry in os.listdir(self.root)
+                      if entry.startswith(prefix))
+
+    def read(self, columns=None, snapshot_date=None, filter=None):
+        expression = filter
+        if snapshot_date is not None:
+            by_date = ds.field(PARTITION_FIELD) == pa.scalar(snapshot_date, pa.date32())
+            expression = by_date if expression is None else expression & by_date
+        return self.dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+    def _pair(self, start, end):
+        dates = self.dates()
+        return start or dates[0], end or dates[-1]
+
+    def rank_movement(self, start=None, end=None, top=None):
+        """Posição de cada repositório nas duas datas; `movimento` positivo significa que subiu no ranking"""
+        start, end = self._pair(start, end)
+        columns = ['nameWithOwner', 'rank']
+        before = self.read(columns, start).rename(columns={'rank': 'rank_inicio'})
+        after = self.read(columns, end).rename(columns={'rank': 'rank_fim'})
+        movement = before.merge(after, on='nameWithOwner', how='inner')
+        movement['movimento'] = movement['rank_inicio'] - movement['rank_fim']
+        movement = movement.sort_values('movimento', ascending=False, key=abs, kind='stable')
+        return movement.head(top) if top else movement
+
+    def entrants_leavers(self, start=None, end=None):
+        """Repositórios que entraram e que saíram do top entre as duas datas, com a posição em que estavam"""
+        start, end = self._pair(start, end)
+        columns = ['nameWithOwner', 'rank']
+        before = self.read(columns, start)
+        after = self.read(columns, end)
+        entrants = after[~after['nameWithOwner'].isin(before['nameWithOwner'])].sort_values('rank')
+        leavers = before[~before['nameWithOwner'].isin(after['nameWithOwner'])].sort_values('rank')
+        return entrants.reset_index(drop=True), leavers.reset_index(drop=True)
+
+    def language_trend(self, metric='pull_requests_aceitas', aggregation='median', languages=None):
+        """Série por data e linguagem: quantidade de repositórios e `aggregation` de `metric`.
+
+        Só as colunas de data, linguagem e métrica são lidas (poucos MB mesmo com centenas de snapshots),
+        e a agregação é um único groupby sobre elas.
+        """
+        filter = None
+        if languages:
+            filter = ds.field('linguagem_primaria').cast(pa.string()).isin(languages)
+        df = self.read([PARTITION_FIELD, 'linguagem_primaria', metric], filter=filter)
+        return df.groupby([PARTITION_FIELD, 'linguagem_primaria'], observed=True, sort=True).agg(
+            repositorios=(metric, 'size'), valor=(metric, aggregation)).reset_index()
+
+    def repo_history(self, name_with_owner, columns=('rank', 'pull_requests_aceitas', 'releases')):
+        """Evolução de um repositório em todos os snapshots"""
+        df = self.read(['nameWithOwner', *columns, PARTITION_FIELD],
+                       filter=ds.field('nameWithOwner') == name_with_owner)
+        return df.sort_values(PARTITION_FIELD).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas sobre o histórico de snapshots do top de repositórios")
+    parser.add_argument("consulta", choices=["datas", "movimento", "entradas", "tendencia", "repositorio"])
+    parser.add_argument("--root", default=SNAPSHOT_DIR)
+    parser.add_argument("--de", type=date.fromisoformat, help="Data inicial (padrão: primeiro snapshot)")
+    parser.add_argument("--ate", type=date.fromisoformat, help="Data final (padrão: último snapshot)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--metrica", default="pull_requests_aceitas")
+    parser.add_argument("--linguagens", help="Linguagens separadas por vírgula (tendência)")
+    parser.add_argument("--repo", help="nameWithOwner (consulta repositorio)")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.root)
+    if args.consulta == "datas":
+        for snapshot_date in store.dates():
+            print(snapshot_date)
+    elif args.consulta == "movimento":
+        print(store.rank_movement(args.de, args.ate, args.top).to_string(index=False))
+    elif args.consulta == "entradas":
+        entrants, leavers = store.entrants_leavers(args.de, args.ate)
+        print(f"Entraram ({len(entrants)}):\n{entrants.head(args.top).to_string(index=False)}")
+        print(f"\nSaíram ({len(leavers)}):\n{leavers.head(args.top).to_string(index=False)}")
+    elif args.consulta == "tendencia":
+        languages = args.linguagens.split(",") if args.linguagens else None
+        print(store.language_trend(args.metrica, languages=languages).to_string(index=False))
+    else:
+        print(store.repo_history(args.repo).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Leitura e gravação do dataset de métricas em Parquet/Feather com esquema fixo (CSV fica como exportação)"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+CSV_PATH = "repo_metrics.csv"
+PARQUET_PATH = "repo_metrics.parquet"
+
+# Contagens em int32, durações em float32 e colunas de texto repetitivo como dicionário
+METRICS_SCHEMA = pa.schema([
+    ('nameWithOwner', pa.string()),
+    ('idade_repositorio_dias', pa.float32()),
+    ('pull_requests_aceitas', pa.int32()),
+    ('releases', pa.int32()),
+    ('tempo_ate_ultima_atualizacao_dias', pa.float32()),
+    ('linguagem_primaria', pa.dictionary(pa.int16(), pa.string())),
+    ('issues_fechadas', pa.int32()),
+    ('total_issues', pa.int32()),
+    ('taxa_resolucao_issues_pct', pa.float32()),
+    ('atividade_recente', pa.dictionary(pa.int8(), pa.string())),
+    ('maturidade', pa.dictionary(pa.int8(), pa.string())),
+    ('created_at', pa.string()),
+    ('pushed_at', pa.string()),
+])
+
+# Cadências derivadas do histórico paginado de cada repositório (modo --history)
+HISTORY_SCHEMA = pa.schema([
+    ('nameWithOwner', pa.string()),
+    ('releases_coletadas', pa.int32()),
+    ('dias_entre_releases_mediana', pa.float32()),
+    ('prs_mescladas_coletadas', pa.int32()),
+    ('prs_mescladas_por_mes', pa.float32()),
+    ('issues_fechadas_coletadas', pa.int32()),
+    ('dias_ate_fechar_issue_mediana', pa.float32()),
+    ('historico_completo', pa.bool_()),
+])
+
+CSV_DTYPES = {
+    'nameWithOwner': 'string',
+    'idade_repositorio_dias': 'float32',
+    'pull_requests_aceitas': 'int32',
+    'releases': 'int32',
+    'tempo_ate_ultima_atualizacao_dias': 'float32',
+    'linguagem_primaria': 'category',
+    'issues_fechadas': 'int32',
+    'total_issues': 'int32',
+    'taxa_resolucao_issues_pct': 'float32',
+    'atividade_recente': 'category',
+    'maturidade': 'category',
+    'created_at': 'string',
+    'pushed_at': 'string',
+}
+
+
+def default_metrics_path():
+    """Usa o Parquet quando existir e cai para o CSV em datasets antigos"""
+    return PARQUET_PATH if os.path.exists(PARQUET_PATH) else CSV_PATH
+
+
+def schema_for(columns, schema=METRICS_SCHEMA):
+    return pa.schema([schema.field(column) for column in columns])
+
+
+def to_arrow(df, schema=METRICS_SCHEMA):
+    """Converte o DataFrame para uma tabela no esquema fixo; 'N/A' em linguagem_primaria vira nulo"""
+    df = df.copy()
+    if 'linguagem_primaria' in df:
+        df['linguagem_primaria'] = df['linguagem_primaria'].astype(object).where(df['linguagem_primaria'] != 'N/A')
+    columns = [field.name for field in schema if field.name in df.columns]
+    return pa.Table.from_pandas(df[columns], schema=schema_for(columns, schema), preserve_index=False, safe=False)
+
+
+def write_metrics(df, path, schema=METRICS_SCHEMA):
+    """Grava o dataset no formato indicado pela extensão (.parquet, .feather ou .csv)"""
+    if path.endswith('.parquet'):
+        pq.write_table(to_arrow(df, schema), path, compression='zstd')
+    elif path.endswith('.feather'):
+        feather.write_feather(to_arrow(df, schema), path, compression='uncompressed')
+    else:
+        if 'linguagem_primaria' in df and df['linguagem_primaria'].isna().any():
+            # No CSV a ausência de linguagem é 'N/A', como no dataset original (o Parquet a guarda como nulo)
+            df = df.assign(linguagem_primaria=df['linguagem_primaria'].astype(object).fillna('N/A'))
+        df.to_csv(path, index=False)
+
+
+def read_metrics_columns(path=None):
+    """Colunas do dataset salvo, lidas só do esquema (Parquet/Feather) ou do cabeçalho (CSV)"""
+    path = path or default_metrics_path()
+    if path.endswith('.parquet'):
+        return pq.read_schema(path).names
+    if path.endswith('.feather'):
+        return feather.read_table(path, memory_map=True).column_names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_metrics(path=None, columns=None):
+    """Lê só as colunas pedidas; Parquet e Feather são abertos com memory map.
+
+    O Feather é gravado sem compressão para que a leitura mapeada não precise copiar os dados.
+    """
+    path = path or default_metrics_path()
+    if path.endswith('.parquet'):
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    if path.endswith('.feather'):
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [column for column in header if columns is None or column in columns]
+    dtypes = {column: dtype for column, dtype in CSV_DTYPES.items() if column in usecols}
+    return pd.read_csv(path, usecols=usecols, dtype=dtypes)
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def repo_nodes():
+    """Fábrica de nós de busca (owner{i}/repo{i}), no formato que o servidor falso conhece"""
+    def make(count):
+        return [{'owner': {'login': f"owner{i}"}, 'name': f"repo{i}"} for i in range(count)]
+    return make
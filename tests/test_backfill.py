@@ -0,0 +1,52 @@
+"""Preenchimento sob demanda das métricas que faltam no dataset salvo (--metrics / --backfill)"""
+import argparse
+
+import pytest
+
+import main
+from cache import ResponseCache
+from fake_github import FakeGitHubServer, fake_repository
+from metrics import build_metrics_frame
+from queries import build_field_selection
+from storage import CSV_PATH, PARQUET_PATH, read_metrics, write_metrics
+
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    """Servidor falso com o main apontado para ele, rodando em um diretório vazio"""
+    monkeypatch.chdir(tmp_path)
+    with FakeGitHubServer(total_repos=50) as server:
+        monkeypatch.setattr(main, 'GITHUB_API_URL', server.url)
+        monkeypatch.setattr(main, 'GITHUB_TOKENS', ['token'])
+        monkeypatch.setattr(main, '_client', None)
+        monkeypatch.setattr(main, '_token_pool', None)
+        yield server
+
+
+def test_backfill_resumes_from_cache_after_partial_failure(fake_api, tmp_path):
+    repos = [fake_repository(f"owner{i}", f"repo{i}") for i in range(50)]
+    narrow = build_metrics_frame(repos, metrics=('age',))
+    write_metrics(narrow, PARQUET_PATH)
+    write_metrics(narrow, CSV_PATH)
+
+    missing = main.missing_metric_groups()
+    assert 'age' not in missing and 'prs' in missing
+    args = argparse.Namespace(use_async=False, batch_size=10, max_nodes=600)
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), 24)
+    fetch = main.details_fetcher(args, cache, build_field_selection(missing))
+
+    fake_api.failing_repos.add("owner7/repo7")
+    with pytest.raises(Exception, match="sem detalhes"):
+        main.backfill_metrics(missing, fetch, cache)
+    assert list(read_metrics().columns) == list(narrow.columns)
+
+    fake_api.failing_repos.clear()
+    requests_before = fake_api.stats()['requests']
+    hits_before = cache.hits
+    df = main.backfill_metrics(missing, fetch, cache)
+    cache.close()
+
+    assert fake_api.stats()['requests'] - requests_before == 1
+    assert cache.hits - hits_before == 49
+    assert main.missing_metric_groups() == ()
+    assert len(df) == 50 and list(df['nameWithOwner']) == list(narrow['nameWithOwner'])
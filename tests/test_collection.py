@@ -0,0 +1,65 @@
+"""Coleta dos detalhes contra o servidor GraphQL falso: vazão, limites secundários e repetições, sem rede"""
+import asyncio
+import threading
+
+from async_collector import AsyncDetailsCollector
+from fake_github import FakeGitHubServer
+from github_client import GitHubGraphQLClient
+from queries import build_batched_details_query
+
+
+def expected_names(count):
+    return [f"owner{i}/repo{i}" for i in range(count)]
+
+
+def test_async_collects_every_repo_under_secondary_limits(repo_nodes):
+    with FakeGitHubServer(total_repos=300, latency=0.01, secondary_limit_every=7, retry_after=0) as server:
+        collector = AsyncDetailsCollector('token', server.url, concurrency=4, batch_size=10)
+        repo_data = asyncio.run(collector.collect(repo_nodes(300)))
+        stats = server.stats()
+
+    assert [repo['nameWithOwner'] for repo in repo_data] == expected_names(300)
+    assert stats['rate_limited'] > 0
+    assert collector.retries == stats['rate_limited']
+    assert collector.requests == stats['requests']
+
+
+def test_async_respects_concurrency(repo_nodes):
+    with FakeGitHubServer(total_repos=200, latency=0.02) as server:
+        collector = AsyncDetailsCollector('token', server.url, concurrency=3, batch_size=5)
+        repo_data = asyncio.run(collector.collect(repo_nodes(200)))
+        stats = server.stats()
+
+    assert len(repo_data) == 200
+    assert 1 < stats['max_in_flight'] <= 3
+
+
+def test_async_recovers_from_timeouts_without_leaking_tokens(repo_nodes):
+    # O servidor começa mais lento que o timeout do cliente e volta ao normal logo depois
+    with FakeGitHubServer(total_repos=40, latency=1.0) as server:
+        threading.Timer(0.8, lambda: setattr(server, 'latency', 0.0)).start()
+        collector = AsyncDetailsCollector('token', server.url, concurrency=4, batch_size=10, timeout=0.3)
+        repo_data = asyncio.run(asyncio.wait_for(collector.collect(repo_nodes(40)), timeout=30))
+
+    assert [repo['nameWithOwner'] for repo in repo_data] == expected_names(40)
+    assert collector.retries > 0
+    state = collector.token_pool.state['token']
+    assert (state['in_flight'], state['reserved']) == (0, 0)
+
+
+def test_client_counts_retries_of_secondary_limits(repo_nodes):
+    nodes = repo_nodes(100)
+    with FakeGitHubServer(total_repos=100, secondary_limit_every=3, retry_after=0) as server:
+        client = GitHubGraphQLClient('token', server.url)
+        repo_data = []
+        for start in range(0, len(nodes), 10):
+            query, variables = build_batched_details_query(nodes[start:start + 10])
+            result = client.execute(query, variables)
+            repo_data.extend(result['data'][f"r{i}"] for i in range(10))
+        stats = server.stats()
+
+    assert [repo['nameWithOwner'] for repo in repo_data] == expected_names(100)
+    operation = client.stats['GetRepoDetailsBatch']
+    assert operation['retries'] == stats['rate_limited'] > 0
+    assert operation['failures'] == 0
+    assert operation['requests'] == stats['requests']
@@ -0,0 +1,38 @@
+"""Atualização incremental (--incremental) do dataset salvo"""
+import pytest
+
+import main
+from fake_github import fake_repository
+from metrics import build_metrics_frame
+from storage import CSV_PATH, write_metrics
+
+
+@pytest.fixture
+def stored_dataset(monkeypatch, tmp_path):
+    """Dataset completo com 30 repositórios salvo em um diretório vazio"""
+    monkeypatch.chdir(tmp_path)
+    repos = [fake_repository(f"owner{i}", f"repo{i}") for i in range(30)]
+    write_metrics(build_metrics_frame(repos), CSV_PATH)
+    return repos
+
+
+def test_refresh_reuses_unchanged_rows(stored_dataset):
+    fetched = []
+
+    def fetch(repo_nodes):
+        fetched.extend(repo_nodes)
+        return repo_nodes
+
+    repo_data = main.refresh_repo_data(30, fetch, CSV_PATH, list_repos=lambda total: stored_dataset[:total])
+
+    assert fetched == []
+    assert [repo['nameWithOwner'] for repo in repo_data] == [repo['nameWithOwner'] for repo in stored_dataset]
+
+
+def test_refresh_refuses_short_listing(stored_dataset):
+    def fetch(repo_nodes):
+        raise AssertionError("a listagem curta não deveria buscar detalhes")
+
+    # A busca sem shards para em 1000 resultados; o restante sumiria do dataset
+    with pytest.raises(Exception, match="20 de 30"):
+        main.refresh_repo_data(30, fetch, CSV_PATH, list_repos=lambda total: stored_dataset[:20])
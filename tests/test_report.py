@@ -0,0 +1,17 @@
+"""Relatórios pulados quando o dataset e o template não mudaram"""
+import generate_report
+from fake_github import fake_repository
+from metrics import build_metrics_frame
+
+
+def test_unchanged_report_skips_stats(monkeypatch, tmp_path):
+    df = build_metrics_frame([fake_repository(f"owner{i}", f"repo{i}") for i in range(30)])
+    path, = generate_report.generate_research_report(df, output_dir=str(tmp_path))
+    report = (tmp_path / "relatorio_final.md").read_text(encoding='utf-8')
+
+    def fail(df):
+        raise AssertionError("as estatísticas não deveriam ser recalculadas")
+
+    monkeypatch.setattr(generate_report, 'compute_research_stats', fail)
+    assert generate_report.generate_research_report(df, output_dir=str(tmp_path)) == [path]
+    assert (tmp_path / "relatorio_final.md").read_text(encoding='utf-8') == report
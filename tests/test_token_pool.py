@@ -0,0 +1,75 @@
+"""Orçamento por token: tokens sem pontos para o custo da query ficam estacionados até o reset"""
+import asyncio
+import time
+
+from async_collector import AsyncDetailsCollector
+from fake_github import FakeGitHubServer
+from github_client import GitHubGraphQLClient
+from queries import build_batched_details_query, estimated_cost
+from token_pool import TokenPool
+
+
+def rate_headers(remaining, reset_in=60):
+    return {'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset': str(int(time.time() + reset_in))}
+
+
+def test_pool_parks_tokens_below_the_query_cost():
+    pool = TokenPool(['a', 'b'])
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first, rate_headers(2))
+    pool.release(second, rate_headers(10))
+
+    token, wait = pool.try_acquire(cost=3)
+    assert token == second
+    pool.release(token, rate_headers(1), cost=3)
+
+    token, wait = pool.try_acquire(cost=3)
+    assert token is None and wait > 50
+    assert pool.try_acquire(cost=2)[0] == first
+
+
+def test_client_waits_for_reset_instead_of_failing(repo_nodes):
+    nodes = repo_nodes(200)
+    with FakeGitHubServer(total_repos=200, points_per_hour=5, reset_interval=1) as server:
+        pool = TokenPool(['t1', 't2', 't3'])
+        client = GitHubGraphQLClient(pool, server.url)
+        names = []
+        for start in range(0, len(nodes), 50):
+            batch = nodes[start:start + 50]
+            query, variables = build_batched_details_query(batch)
+            result = client.execute(query, variables, estimated_cost(len(batch)))
+            names.extend(result['data'][f"r{i}"]['nameWithOwner'] for i in range(len(batch)))
+        stats = server.stats()
+
+    assert names == [f"owner{i}/repo{i}" for i in range(200)]
+    assert stats['rate_limited'] == 0
+    assert client.stats['GetRepoDetailsBatch']['failures'] == 0
+    assert all(usage['requests'] for usage in pool.summary().values())
+
+
+def test_async_collector_spreads_batches_across_tokens(repo_nodes):
+    with FakeGitHubServer(total_repos=300, latency=0.01, points_per_hour=5, reset_interval=1) as server:
+        pool = TokenPool(['t1', 't2', 't3'])
+        collector = AsyncDetailsCollector(pool, server.url, concurrency=4, batch_size=50)
+        repo_data = asyncio.run(collector.collect(repo_nodes(300)))
+
+    assert [repo['nameWithOwner'] for repo in repo_data] == [f"owner{i}/repo{i}" for i in range(300)]
+    assert collector.retries == 0
+    assert sorted(usage['requests'] for usage in pool.summary().values()) == [2, 2, 2]
+
+
+def test_client_releases_the_token_on_unexpected_errors():
+    pool = TokenPool(['a'])
+    client = GitHubGraphQLClient(pool, 'http://127.0.0.1:1/graphql')
+
+    def fail(*args, **kwargs):
+        raise ValueError("falha inesperada")
+
+    client.session.post = fail
+    try:
+        client.execute("query Anything { viewer { login } }", cost=3)
+    except ValueError:
+        pass
+    state = pool.state['a']
+    assert (state['in_flight'], state['reserved']) == (0, 0)
+    assert pool.try_acquire(cost=3)[0] == 'a'
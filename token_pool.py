@@ -0,0 +1,83 @@
+"""Conjunto de tokens do GitHub com controle do orçamento de pontos de cada um"""
+import asyncio
+import threading
+import time
+
+# X-RateLimit-Reset vem em segundos inteiros; a margem evita usar o token um pouco antes do reset real
+RESET_MARGIN = 1.0
+
+
+class TokenPool:
+    """Distribui as requisições entre vários tokens de acordo com o remaining/resetAt de cada um.
+
+    Cada pedido informa o custo estimado da query: tokens com menos pontos que isso ficam estacionados
+    até o reset em vez de receberem um 403; se todos estiverem esgotados, quem pede espera o primeiro reset.
+    """
+
+    def __init__(self, tokens, min_remaining=1):
+        if not tokens:
+            raise Exception("Nenhum token do GitHub configurado. Configure TOKEN ou TOKENS.")
+        self.min_remaining = min_remaining
+        self.lock = threading.Lock()
+        self.state = {token: {'remaining': None, 'reset_at': 0.0, 'in_flight': 0, 'reserved': 0, 'requests': 0}
+                      for token in tokens}
+
+    def __len__(self):
+        return len(self.state)
+
+    def _available(self, state, now):
+        """Pontos que ainda podem ser usados, descontando o custo das requisições em andamento"""
+        if state['remaining'] is None or state['reset_at'] + RESET_MARGIN <= now:
+            # Saldo desconhecido ou já renovado: uma requisição por vez até a resposta trazer o saldo
+            return 0 if state['in_flight'] else float('inf')
+        return state['remaining'] - state['reserved']
+
+    def try_acquire(self, cost=1):
+        """Retorna (token, 0) com o token de maior saldo que cubra `cost`, ou (None, espera) se todos estiverem estacionados"""
+        now = time.time()
+        with self.lock:
+            # Em caso de empate (tokens ainda sem saldo conhecido), fica o com menos requisições em andamento
+            token, state = max(self.state.items(),
+                               key=lambda item: (self._available(item[1], now), -item[1]['in_flight']))
+            if self._available(state, now) >= max(cost, self.min_remaining):
+                state['in_flight'] += 1
+                state['reserved'] += cost
+                state['requests'] += 1
+                return token, 0.0
+            if any(state['in_flight'] for state in self.state.values()):
+                # Pontos reservados por requisições em andamento voltam assim que elas terminarem
+                return None, 0.1
+            next_reset = min(state['reset_at'] for state in self.state.values()) + RESET_MARGIN
+            return None, max(next_reset - now, 0.1)
+
+    def acquire(self, cost=1):
+        token, wait = self.try_acquire(cost)
+        while token is None:
+            if wait >= 1:
+                print(f"\nTodos os tokens sem pontos; aguardando {wait:.0f}s pelo próximo reset...")
+            time.sleep(wait)
+            token, wait = self.try_acquire(cost)
+        return token
+
+    async def acquire_async(self, cost=1):
+        token, wait = self.try_acquire(cost)
+        while token is None:
+            await asyncio.sleep(wait)
+            token, wait = self.try_acquire(cost)
+        return token
+
+    def release(self, token, headers=None, cost=1):
+        """Devolve o token (com o `cost` usado no acquire) atualizando o saldo pelos cabeçalhos X-RateLimit-*"""
+        with self.lock:
+            state = self.state[token]
+            state['in_flight'] -= 1
+            state['reserved'] -= cost
+            if headers and headers.get('X-RateLimit-Remaining') is not None:
+                state['remaining'] = int(headers['X-RateLimit-Remaining'])
+                state['reset_at'] = float(headers.get('X-RateLimit-Reset', state['reset_at']))
+
+    def summary(self):
+        """Requisições e saldo de cada token (identificado só pelos últimos caracteres)"""
+        with self.lock:
+            return {f"...{token[-4:]}": {'requests': state['requests'], 'remaining': state['remaining']}
+                    for token, state in self.state.items()}